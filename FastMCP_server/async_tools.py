@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database_connection import DBConnection
+from result_cache import ResultCache
+from study_program_tools import TableStudyPrograms
+from courses_tools import TableCourses
+from courseid_lookup_tools import TableStudyCoursesLookup
+from location_lookup_tools import TableStudyProgramLocationLookup
+
+"""
+Async variants of the tool classes, to be exposed as tools in the MCP Server
+
+The tool classes use the blocking mysql-connector driver. The async variants
+run every tool call on a bounded thread pool instead of the event loop
+thread, so one slow query does not stall the other in-flight MCP requests:
+- max_workers calls run at the same time (match it to the DB pool size),
+- at most max_pending calls are queued or running; further calls wait on
+  the event loop without blocking it,
+- a call that takes longer than call_timeout seconds returns an error
+  (the query itself finishes in the background).
+With a ResultCache, results are answered from the cache when possible and
+only misses are run on the pool.
+"""
+
+MAX_WORKERS = 8
+MAX_PENDING = 64
+CALL_TIMEOUT = 30.0
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING, call_timeout: float = CALL_TIMEOUT):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-db")
+        self._slots = asyncio.Semaphore(max(max_workers, max_pending))
+        self.call_timeout = call_timeout
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "running": 0, "waiting": 0, "timeouts": 0}
+
+    def _count(self, key: str, delta: int):
+        with self._lock:
+            self.stats[key] += delta
+
+    async def run(self, fn, *args, **kwargs):
+        '''
+        Run fn(*args, **kwargs) on the thread pool and return its result
+        '''
+        self._count("calls", 1)
+        self._count("waiting", 1)
+        async with self._slots:
+            self._count("waiting", -1)
+            self._count("running", 1)
+            try:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+                return await asyncio.wait_for(call, timeout=self.call_timeout)
+            except asyncio.TimeoutError:
+                self._count("timeouts", 1)
+                return {"status":"error", "error_message":f"Query timed out after {self.call_timeout}s"}
+            finally:
+                self._count("running", -1)
+
+    def wrap(self, method):
+        '''
+        Return an async function with the same name, signature and docstring as method
+        '''
+        @functools.wraps(method)
+        async def tool(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+        return tool
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class AsyncTable:
+    '''
+    Async view of a tool class: its public methods become coroutines run on the executor
+    '''
+    def __init__(self, tools, executor: BoundedExecutor, cache: ResultCache = None):
+        self.tools = tools
+        self.executor = executor
+        for name, method in inspect.getmembers(tools, inspect.ismethod):
+            if name.startswith("_"):
+                continue
+            if cache is not None:
+                setattr(self, name, cache.wrap(f"{type(tools).__name__}.{name}", method, executor))
+            else:
+                setattr(self, name, executor.wrap(method))
+
+
+class AsyncTableStudyPrograms(AsyncTable):
+    def __init__(self, conn: DBConnection, table: str, executor: BoundedExecutor, cache: ResultCache = None):
+        super().__init__(TableStudyPrograms(conn, table), executor, cache)
+
+
+class AsyncTableCourses(AsyncTable):
+    def __init__(self, conn: DBConnection, table: str, executor: BoundedExecutor, cache: ResultCache = None):
+        super().__init__(TableCourses(conn, table), executor, cache)
+
+
+class AsyncTableStudyCoursesLookup(AsyncTable):
+    def __init__(self, conn: DBConnection, table: str, executor: BoundedExecutor, cache: ResultCache = None):
+        super().__init__(TableStudyCoursesLookup(conn, table), executor, cache)
+
+
+class AsyncTableStudyProgramLocationLookup(AsyncTable):
+    def __init__(self, conn: DBConnection, table: str, executor: BoundedExecutor, cache: ResultCache = None):
+        super().__init__(TableStudyProgramLocationLookup(conn, table), executor, cache)
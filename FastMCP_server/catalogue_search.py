@@ -0,0 +1,289 @@
+import hashlib
+import math
+import re
+import threading
+
+import mysql.connector
+from catalogue_snapshot import CatalogueSnapshot, SnapshotStore, lookup_key
+
+"""
+Full-text search over study programs and courses, to be exposed as a tool in the MCP Server
+
+The catalogue is indexed in an inverted index (term -> document -> term
+frequency) and ranked with BM25. Programs are indexed on their title,
+description, category, why_choose, learnings, teaching_format and
+career_opportunities; courses on their title and learning outcomes
+(knowledge, skills, competence). Titles count TITLE_WEIGHT times.
+
+Text is tokenized for Norwegian: lowercased, split on letters and digits
+(æ, ø, å included), stopwords dropped and common inflection suffixes
+stripped, so "sykepleieren", "sykepleiere" and "sykepleier" match (run this
+module to check the stemmer).
+
+The index follows a SnapshotStore: it is built from the first snapshot and,
+when a new snapshot is loaded, only documents whose text changed are
+re-indexed and removed ones are dropped. When the store has no background
+refresh (the server runs without --snapshot), each search asks the store for
+the current snapshot, so the index is built on the first search and follows
+catalogue_version changes from then on.
+"""
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+SNIPPET_LENGTH = 160
+MAX_LIMIT = 50
+
+PROGRAM_FIELDS = ["study_description", "study_category", "why_choose", "learnings", "teaching_format",
+                  "career_opportunities"]
+COURSE_FIELDS = ["learned_knowledge", "learned_skills", "learned_competence"]
+FILTERS = ["kind", "category", "location_id", "study_level"]
+
+STOPWORDS = frozenset("""
+alle andre at av bare begge ble bli blir blitt både da de deg dei deim deira deires dem den denne der dere deres
+det dette di din disse ditt du dykk dykkar då eg ein eit eitt eller elles en ene eneste enhver enn er et ett
+etter for fordi fra før ha hadde han hans har hennar henne hennes her hjå ho hoe honom hoss hossen hun hva hvem
+hver hvilke hvilken hvis hvor hvordan hvorfor i ikke ikkje ingen ingi inkje inn inni ja jeg kan kom korleis
+korso kun kunne kva kvar kvarhelst kven kvi kvifor man mange me med medan meg meget mellom men mi min mine mitt
+mot mye mykje ned no noe noen noka noko nokon nokor nokre nå når og også om opp oss over på samme seg selv si
+sia sidan siden sin sine sitt sjøl skal skulle slik so som somme somt så sånn til um upp ut uten var vart varte
+ved vere verte vi vil ville vore vors vort vår være vært å
+""".split())
+
+# bøyningsendelser, lengste først (forenklet etter Snowball-stemmeren for norsk)
+SUFFIXES = sorted("""
+hetenes hetene hetens heten heter endes edes enes ande ende ene ane ens ers ets het ast ede en er ar as es et a e
+""".split(), key=len, reverse=True)
+MIN_STEM = 3
+# flertall og bestemt form av ord på -er føres tilbake til -er først: sykepleiere/sykepleieren -> sykepleier
+ER_FORMS = ("erne", "eren", "ere")
+
+_WORD = re.compile(r"[0-9a-zæøåéèêóòôüäö]+")
+
+
+def stem(word: str) -> str:
+    for suffix in ER_FORMS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)] + "er"
+            break
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    # genitiv-s: "skolens" -> "skolen" -> "skol"
+    if word.endswith("s") and len(word) - 1 >= MIN_STEM and word[-2] not in "aeiouyæøås":
+        return word[:-1]
+    return word
+
+
+def tokenize(text) -> list:
+    '''
+    Split text into stemmed Norwegian search terms without stopwords
+    '''
+    if text is None:
+        return []
+    return [stem(word) for word in _WORD.findall(str(text).lower()) if word not in STOPWORDS]
+
+
+def _documents(snapshot: CatalogueSnapshot) -> dict:
+    '''
+    doc_id -> (title, {field: text}, metadata) for every program and course in the snapshot
+    '''
+    documents = {}
+    for program in snapshot.programs.values():
+        meta = {"kind": "program", "study_title": program["study_title"],
+                "category": program.get("study_category"), "location_id": program.get("location_id"),
+                "location": snapshot.locations.get(program.get("location_id")), "study_level": program.get("study_level")}
+        fields = {field: program.get(field) for field in PROGRAM_FIELDS if program.get(field)}
+        documents[f"program:{program['study_title']}"] = (program["study_title"], fields, meta)
+    for course in snapshot.courses.values():
+        meta = {"kind": "course", "course_id": course["course_id"], "course_title": course["course_title"],
+                "study_level": course.get("study_level"),
+                "study_programs": list(snapshot.course_programs.get(lookup_key(course["course_id"]), []))}
+        fields = {field: course.get(field) for field in COURSE_FIELDS if course.get(field)}
+        documents[f"course:{course['course_id']}"] = (course["course_title"], fields, meta)
+    return documents
+
+
+def _fingerprint(title, fields: dict, meta: dict) -> str:
+    text = repr((title, sorted(fields.items()), sorted(meta.items(), key=lambda kv: kv[0])))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _snippet(fields: dict, terms: set) -> str:
+    '''
+    The part of the first field that contains a query term
+    '''
+    for text in fields.values():
+        text = " ".join(str(text).split())
+        for match in _WORD.finditer(text.lower()):
+            if stem(match.group()) in terms:
+                start = max(0, match.start() - SNIPPET_LENGTH // 3)
+                if start:
+                    # start på et helt ord
+                    start = min(text.find(" ", start) + 1, match.start())
+                snippet = text[start:start + SNIPPET_LENGTH]
+                return ("…" if start else "") + snippet + ("…" if start + SNIPPET_LENGTH < len(text) else "")
+    return ""
+
+
+class CatalogueSearch:
+    def __init__(self, store: SnapshotStore = None):
+        # term -> {doc_id: termfrekvens}
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._docs = {}
+        self._lock = threading.Lock()
+        self.counts = {"indexed": 0, "removed": 0, "searches": 0}
+        self.version = None
+        self.store = store
+        if store is not None:
+            store.subscribe(self.update)
+
+    def _add(self, doc_id: str, title, fields: dict, meta: dict, fingerprint: str):
+        terms = tokenize(title) * TITLE_WEIGHT
+        for text in fields.values():
+            terms.extend(tokenize(text))
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, count in frequencies.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        self._lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+        self._docs[doc_id] = {"fingerprint": fingerprint, "terms": list(frequencies), "fields": fields, "meta": meta}
+        self.counts["indexed"] += 1
+
+    def _remove(self, doc_id: str):
+        doc = self._docs.pop(doc_id)
+        for term in doc["terms"]:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+        self.counts["removed"] += 1
+
+    def update(self, snapshot: CatalogueSnapshot) -> int:
+        '''
+        Bring the index in line with snapshot, re-indexing only changed documents; return how many changed
+        '''
+        documents = _documents(snapshot)
+        changed = 0
+        with self._lock:
+            for doc_id in [doc_id for doc_id in self._docs if doc_id not in documents]:
+                self._remove(doc_id)
+                changed += 1
+            for doc_id, (title, fields, meta) in documents.items():
+                fingerprint = _fingerprint(title, fields, meta)
+                current = self._docs.get(doc_id)
+                if current is not None:
+                    if current["fingerprint"] == fingerprint:
+                        continue
+                    self._remove(doc_id)
+                self._add(doc_id, title, fields, meta, fingerprint)
+                changed += 1
+            self.version = snapshot.version
+        return changed
+
+    def _matches(self, meta: dict, filters: dict) -> bool:
+        for name, wanted in filters.items():
+            value = meta.get(name)
+            if name == "category" and meta["kind"] == "course":
+                return False
+            if value is None or str(value).strip().casefold() != str(wanted).strip().casefold():
+                return False
+        return True
+
+    def search_catalogue(self, query: str, limit: int = 10, filters: dict | None = None) -> dict:
+        """
+        One-line: Full-text search over study programs and courses, best matches first.
+
+        Parameters:
+            query (str): Free text in Norwegian, e.g. "jobbe med barn" or "elektro automasjon".
+                Programs are matched on title, description, category, why_choose, learnings,
+                teaching_format and career_opportunities; courses on title and learning outcomes.
+            limit (int): Maximum number of hits (1-50, default 10).
+            filters (dict, optional): Only return hits matching all of:
+                - kind: "program" | "course"
+                - category: study program category (programs only)
+                - location_id: study location id (programs only)
+                - study_level: study level
+
+        Returns:
+            dict: {
+                "status": "success" | "not_found" | "error",
+                "result": list of hits with "kind", "score", "snippet" and either
+                          "study_title", "category", "location_id", "location", "study_level" (programs) or
+                          "course_id", "course_title", "study_level", "study_programs" (courses),
+                "error_message": str (optional)
+            }
+
+        Example:
+            {"status":"success","result":[{"kind":"program","study_title":"Barnevern","category":"Helse",
+             "location_id":2,"location":"Drammen campus","score":7.41,"snippet":"…arbeid med barn og unge…"}]}
+
+        Notes:
+            - Use the returned exact titles and course ids with the other tools for details.
+        """
+        if not isinstance(query, str) or not query.strip():
+            return {"status":"error", "error_message":"Query must be a non-empty string"}
+        filters = filters or {}
+        unknown = [name for name in filters if name not in FILTERS]
+        if unknown:
+            return {"status":"error", "error_message":f"Unknown filter(s): {', '.join(unknown)} (use {', '.join(FILTERS)})"}
+        try:
+            limit = max(1, min(int(limit), MAX_LIMIT))
+        except (TypeError, ValueError):
+            return {"status":"error", "error_message":"Limit must be an integer"}
+        terms = set(tokenize(query))
+        if not terms:
+            return {"status":"not_found", "error_message":"Query contains only stopwords"}
+        if self.store is not None:
+            try:
+                self.store.current()
+            except mysql.connector.Error as err:
+                # søk i forrige indeks hvis katalogen ikke kunne lastes på nytt
+                if self.store.snapshot is None:
+                    return {"status":"error", "error_message":f"{err}"}
+
+        with self._lock:
+            self.counts["searches"] += 1
+            count = len(self._docs)
+            if not count:
+                return {"status":"error", "error_message":"Search index is empty"}
+            average = self._total_length / count
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = K1 * (1 - B + B * self._lengths[doc_id] / average)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+            hits = []
+            for doc_id, score in ranked:
+                doc = self._docs[doc_id]
+                if filters and not self._matches(doc["meta"], filters):
+                    continue
+                hits.append({**doc["meta"], "score": round(score, 4), "snippet": _snippet(doc["fields"], terms)})
+                if len(hits) == limit:
+                    break
+        if not hits:
+            return {"status":"not_found", "error_message":"No programs or courses match the query"}
+        return {"status":"success", "result": hits}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counts, "documents": len(self._docs), "terms": len(self._postings), "version": self.version}
+
+
+if __name__ == "__main__":
+    # verify that inflected forms share a stem
+    for forms in (("sykepleier", "sykepleiere", "sykepleieren", "sykepleierne"), ("leder", "ledere", "lederen"),
+                  ("skole", "skolen", "skolene"), ("barn", "barna", "barnet")):
+        stems = {stem(word) for word in forms}
+        assert len(stems) == 1, (forms, stems)
+    print("✓ Stemmer: inflected forms share a stem")
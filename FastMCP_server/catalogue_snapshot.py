@@ -0,0 +1,351 @@
+import threading
+import time
+
+import mysql.connector
+from database_connection import DBConnection
+from study_program_tools import TableStudyPrograms
+from courses_tools import TableCourses
+from courseid_lookup_tools import TableStudyCoursesLookup
+from location_lookup_tools import TableStudyProgramLocationLookup
+
+"""
+In-memory snapshot of the catalogue, to serve the MCP tools without queries
+
+The catalogue (study_programs, courses, study_place and
+lookuptalbe_study_course) is a few thousand rows, so the whole of it is
+loaded into indexed dicts: programs by title and by category, courses by id
+and by title, locations by id, and program -> courses adjacency.
+The Snapshot* tool classes answer the same tools as the Table* classes, with
+the same results, from the current snapshot.
+
+MySQL stays the source of truth. A background thread reads the
+catalogue_version stamp every refresh_interval seconds and, when it has
+changed, loads a new snapshot and swaps it in with one assignment, so a tool
+call always sees one complete snapshot. Without the version table (an older
+schema) the snapshot is reloaded every fallback_interval seconds.
+Listeners added with subscribe() (such as the search index) are called with
+every snapshot that is loaded. Without start() there is no background
+thread: current() loads the snapshot on first use and checks the version at
+most every refresh_interval seconds when it is called.
+
+Title, category and course title lookups ignore case, like the default
+MySQL collation.
+"""
+
+REFRESH_INTERVAL = 2.0
+FALLBACK_INTERVAL = 60.0
+# forsøk på å lese et snapshot som ikke ble endret underveis
+LOAD_ATTEMPTS = 3
+
+
+def lookup_key(text) -> str:
+    return str(text).strip().casefold()
+
+
+class CatalogueSnapshot:
+    '''
+    One consistent, read-only copy of the catalogue with its indexes
+    '''
+    def __init__(self, program_columns: list, program_rows: list, course_columns: list, course_rows: list,
+                 location_rows: list, lookup_rows: list, version=None):
+        self.version = version
+        self.loaded_at = time.time()
+        self.program_columns = program_columns
+        self.course_columns = course_columns
+
+        # radene som dict kolonne -> verdi, med samme typer som spørringene gir
+        self.programs = {}
+        self.categories = {}
+        for row in program_rows:
+            program = dict(zip(program_columns, row))
+            self.programs.setdefault(lookup_key(program["study_title"]), program)
+            category = program.get("study_category")
+            if category is not None:
+                self.categories.setdefault(lookup_key(category), {"name": category, "titles": []})["titles"].append(program["study_title"])
+
+        self.courses = {}
+        self.courses_by_title = {}
+        for row in course_rows:
+            course = dict(zip(course_columns, row))
+            self.courses.setdefault(lookup_key(course["course_id"]), course)
+            self.courses_by_title.setdefault(lookup_key(course["course_title"]), []).append(course["course_id"])
+
+        self.locations = {int(location_id): name for location_id, name in location_rows}
+
+        # studium -> emner og emne -> studier
+        self.program_courses = {}
+        self.course_programs = {}
+        for study_title, course_id in lookup_rows:
+            courses = self.program_courses.setdefault(lookup_key(study_title), [])
+            if course_id not in courses:
+                courses.append(course_id)
+            programs = self.course_programs.setdefault(lookup_key(course_id), [])
+            if study_title not in programs:
+                programs.append(study_title)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "study_programs": len(self.programs),
+            "courses": len(self.courses),
+            "locations": len(self.locations),
+            "categories": len(self.categories),
+            "course_links": sum(len(courses) for courses in self.program_courses.values()),
+        }
+
+
+class SnapshotStore:
+    '''
+    Holds the current snapshot and reloads it when the catalogue version changes
+    '''
+    def __init__(self, conn: DBConnection, database: str = "fagskolen", refresh_interval: float = REFRESH_INTERVAL,
+                 fallback_interval: float = FALLBACK_INTERVAL):
+        self.conn = conn
+        self.database = database
+        self.refresh_interval = refresh_interval
+        self.fallback_interval = fallback_interval
+        self.snapshot: CatalogueSnapshot = None
+        self.counts = {"loads": 0, "checks": 0, "failures": 0, "listener_failures": 0}
+        self._listeners = []
+        self._checked_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read_version(self):
+        '''
+        Return the catalogue version stamp, or None without a catalogue_version table
+        '''
+        try:
+            result = self.conn.query(f"SELECT version FROM {self.database}.catalogue_version WHERE id = 1")
+            return int(result[0][0]) if result else 0
+        except mysql.connector.Error:
+            return None
+
+    def _columns(self, table: str) -> list:
+        return [column[0] for column in self.conn.query(f"DESCRIBE {self.database}.{table}")]
+
+    def _select(self, table: str, columns: list) -> list:
+        return self.conn.query(f"SELECT {','.join(columns)} FROM {self.database}.{table}")
+
+    def load(self) -> CatalogueSnapshot:
+        '''
+        Read all four tables into a new snapshot and make it the current one
+        '''
+        for _ in range(LOAD_ATTEMPTS):
+            version = self.read_version()
+            program_columns = self._columns("study_programs")
+            course_columns = self._columns("courses")
+            snapshot = CatalogueSnapshot(
+                program_columns, self._select("study_programs", program_columns),
+                course_columns, self._select("courses", course_columns),
+                self._select("study_place", ["location_id", "location_name"]),
+                self._select("lookuptalbe_study_course", ["study_title", "course_id"]),
+                version,
+            )
+            # en innlesing som skrev underveis gir en blanding av to versjoner: les på nytt
+            if self.read_version() == version:
+                break
+        self.snapshot = snapshot
+        self.counts["loads"] += 1
+        for listener in self._listeners:
+            self._publish(listener, snapshot)
+        return snapshot
+
+    def _publish(self, listener, snapshot: CatalogueSnapshot):
+        # en feilende lytter skal ikke stoppe oppdateringen av snapshotet eller de andre lytterne
+        try:
+            listener(snapshot)
+        except Exception as err:
+            self.counts["listener_failures"] += 1
+            print(f"✗ Catalogue snapshot listener {getattr(listener, '__qualname__', listener)} failed: {err!r}")
+
+    def subscribe(self, listener):
+        '''
+        Call listener(snapshot) with the current snapshot and every snapshot loaded later
+        '''
+        self._listeners.append(listener)
+        if self.snapshot is not None:
+            self._publish(listener, self.snapshot)
+
+    def refresh(self) -> bool:
+        '''
+        Reload the snapshot if the catalogue has changed; return True if it was reloaded
+        '''
+        self.counts["checks"] += 1
+        version = self.read_version()
+        current = self.snapshot
+        if current is not None and version == current.version:
+            if version is not None or time.time() - current.loaded_at < self.fallback_interval:
+                return False
+        self.load()
+        return True
+
+    def current(self) -> CatalogueSnapshot:
+        '''
+        Return the current snapshot; without the background refresh, load or refresh it here when due
+        '''
+        if self._thread is None:
+            with self._refresh_lock:
+                if self.snapshot is None or time.monotonic() - self._checked_at >= self.refresh_interval:
+                    self._checked_at = time.monotonic()
+                    self.refresh()
+        return self.snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                if self.refresh():
+                    print(f"✓ Catalogue snapshot reloaded (version {self.snapshot.version})")
+            except Exception as err:
+                # behold forrige snapshot og prøv igjen ved neste intervall
+                self.counts["failures"] += 1
+                print(f"✗ Catalogue snapshot refresh failed: {err!r}")
+
+    def start(self):
+        '''
+        Load the first snapshot and start the background refresh
+        '''
+        if self.snapshot is None:
+            self.load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalogue-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_snapshot_stats(self) -> dict:
+        """
+        One-line: Return the size, version and age of the in-memory catalogue snapshot.
+
+        Parameters:
+            None
+
+        Returns:
+            dict: {"status":"success", "result": {"version": int|None, "loaded_at": float, "study_programs": int,
+                   "courses": int, "locations": int, "categories": int, "course_links": int,
+                   "loads": int, "checks": int, "failures": int, "listener_failures": int}}
+
+        Example:
+            {"status":"success","result":{"version":7,"study_programs":124,"courses":830,"loads":3}}
+        """
+        if self.snapshot is None:
+            return {"status":"error", "error_message":"Catalogue snapshot is not loaded"}
+        return {"status":"success", "result": {**self.snapshot.stats(), **self.counts}}
+
+
+def _fields(record: dict, fields: list[str]) -> dict:
+    unknown = [field for field in fields if field not in record]
+    if unknown or not fields:
+        return {"status":"error", "error_message":f"Unknown field(s): {', '.join(unknown) or 'none given'}"}
+    return {"status":"success", "result": {field: record[field] for field in fields}}
+
+
+class SnapshotStudyPrograms(TableStudyPrograms):
+    def __init__(self, store: SnapshotStore):
+        self.store = store
+
+    def get_number_of_study_programs(self) -> dict:
+        return {"status":"success", "result": len(self.store.snapshot.programs)}
+
+    def get_study_program_categories(self) -> dict:
+        categories = self.store.snapshot.categories
+        if not categories:
+            return {"status":"error", "error_message":"Query returned no results"}
+        return {"status":"success", "result": [category["name"] for category in categories.values()]}
+
+    def get_category_study_programs(self, category: str) -> dict:
+        found = self.store.snapshot.categories.get(lookup_key(category))
+        if not found:
+            return {"status":"not_found", "error_message":"Category not found"}
+        return {"status":"success", "result": list(found["titles"])}
+
+    def get_study_programs_names(self) -> dict:
+        programs = self.store.snapshot.programs
+        if not programs:
+            return {"status":"error", "error_message":"Query returned no results"}
+        return {"status":"success", "result": [program["study_title"] for program in programs.values()]}
+
+    def get_study_program_datafields(self) -> dict:
+        return {"status":"success", "result": self.store.snapshot.program_columns[2:]}
+
+    def get_study_program_datafields_values(self, program_name: str, fields: list[str]) -> dict:
+        program = self.store.snapshot.programs.get(lookup_key(program_name))
+        if program is None:
+            return {"status":"not_found", "error_message":"Datafields not found"}
+        return _fields(program, fields)
+
+
+class SnapshotCourses(TableCourses):
+    def __init__(self, store: SnapshotStore):
+        self.store = store
+
+    def get_number_of_courses(self) -> dict:
+        return {"status":"success", "result": len(self.store.snapshot.courses)}
+
+    def get_all_course_titles(self) -> dict:
+        courses = self.store.snapshot.courses
+        if not courses:
+            return {"status":"error", "error_message":"Query returned no results"}
+        return {"status":"success", "result": [course["course_title"] for course in courses.values()]}
+
+    def get_course_ID(self, course_title: str) -> dict:
+        found = self.store.snapshot.courses_by_title.get(lookup_key(course_title))
+        if not found:
+            return {"status":"not_found", "error_message":"Course not found"}
+        return {"status":"success", "result": list(found)}
+
+    def get_course_datafields(self) -> dict:
+        return {"status":"success", "result": self.store.snapshot.course_columns[1:]}
+
+    def get_course_datafields_values(self, course_id: str, fields: list[str]) -> dict:
+        course = self.store.snapshot.courses.get(lookup_key(course_id))
+        if course is None:
+            return {"status":"not_found", "error_message":"Course not found"}
+        return _fields(course, fields)
+
+
+class SnapshotStudyCoursesLookup(TableStudyCoursesLookup):
+    def __init__(self, store: SnapshotStore):
+        self.store = store
+
+    def get_study_program_courseIDs(self, study_title: str) -> list:
+        found = self.store.snapshot.program_courses.get(lookup_key(study_title))
+        if not found:
+            return {"status":"not_found", "error_message":"Study program not found"}
+        return {"status":"success", "result": list(found)}
+
+
+class SnapshotStudyProgramLocationLookup(TableStudyProgramLocationLookup):
+    def __init__(self, store: SnapshotStore):
+        self.store = store
+
+    def get_study_program_location(self, location_id:int) -> str:
+        try:
+            name = self.store.snapshot.locations.get(int(location_id))
+        except (TypeError, ValueError):
+            name = None
+        if name is None:
+            return {"status":"not_found", "error_message": f"Location ID {location_id} not found"}
+        return {"status":"success", "result": name}
+
+
+# verktøyene beskrives for agenten med docstringene til SQL-variantene
+for _cls in (SnapshotStudyPrograms, SnapshotCourses, SnapshotStudyCoursesLookup, SnapshotStudyProgramLocationLookup):
+    for _name, _method in vars(_cls).items():
+        if not _name.startswith("_"):
+            _method.__doc__ = getattr(_cls.__bases__[0], _name).__doc__
+
+
+if __name__ == "__main__":
+    # verify snapshot loading
+    try:
+        store = SnapshotStore(DBConnection())
+        print(store.load().stats())
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
@@ -1,34 +1,151 @@
+import queue
+import threading
+import time
+
 import mysql.connector
+from mysql.connector import errors
 
 '''
-Class for establishing a connection to the database and execute queries on the database
+Class for establishing a pool of connections to the database and execute queries on the database
+
+Every query checks out a connection, runs on its own cursor and returns the
+connection to the pool, so tools can run queries in parallel. Connections are
+opened lazily up to pool_size; a checkout waits at most checkout_timeout
+seconds for a free connection. Connections that have been idle longer than
+idle_check seconds are pinged (and reopened if dead) before they are used.
+Connections run with autocommit, so every query sees the latest committed data.
 '''
 
+POOL_SIZE = 8
+CHECKOUT_TIMEOUT = 10.0
+IDLE_CHECK = 30.0
+
+
+class PoolTimeout(errors.PoolError):
+    '''
+    No connection became free within the checkout timeout
+    '''
+
+
 class DBConnection:
-    def __init__(self, host: str = "127.0.0.1", user: str = "root", password: str = "admin"):
-        self.conn = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            use_pure=True
-        )
+    def __init__(self, host: str = "127.0.0.1", user: str = "root", password: str = "admin",
+                 pool_size: int = POOL_SIZE, checkout_timeout: float = CHECKOUT_TIMEOUT, idle_check: float = IDLE_CHECK):
         """
         intialize variables
         """
-        self.cursor = self.conn.cursor()
+        self.settings = {"host": host, "user": user, "password": password, "use_pure": True, "autocommit": True}
+        self.pool_size = max(1, pool_size)
+        self.checkout_timeout = checkout_timeout
+        self.idle_check = idle_check
+        # ledige forbindelser som (forbindelse, sist brukt)
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self.stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "reconnects": 0}
+        # åpne én forbindelse med en gang, så feil konfigurasjon oppdages ved oppstart
+        self._release(self._open())
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.settings)
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except errors.Error:
+            pass
+
+    def _checkout(self):
+        '''
+        Return a live connection, waiting up to checkout_timeout for one to be released
+        '''
+        with self._lock:
+            self.stats["checkouts"] += 1
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    # reserver plassen før forbindelsen åpnes utenfor låsen
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = mysql.connector.connect(**self.settings)
+                except errors.Error:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+                return conn
+            with self._lock:
+                self.stats["waits"] += 1
+            try:
+                conn, last_used = self._idle.get(timeout=self.checkout_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise PoolTimeout(f"no database connection free within {self.checkout_timeout}s "
+                                  f"(pool size {self.pool_size})")
+
+        if time.monotonic() - last_used > self.idle_check:
+            try:
+                conn.ping(reconnect=True, attempts=1, delay=0)
+            except errors.Error:
+                # forbindelsen er død og lar seg ikke gjenopprette: åpne en ny
+                self._discard(conn)
+                conn = self._open()
+                with self._lock:
+                    self.stats["reconnects"] += 1
+        return conn
+
+    def _release(self, conn):
+        self._idle.put((conn, time.monotonic()))
 
     def check_connection(self):
          '''
          Test database connection
          '''
-         self.conn.ping(reconnect=True, attempts=1, delay=0)
+         conn = self._checkout()
+         try:
+             conn.ping(reconnect=True, attempts=1, delay=0)
+         finally:
+             self._release(conn)
+
+    def query(self, query: str, params: tuple = None) -> list:
+        '''
+        executes a SQL query on a pooled connection and returns the result
+        '''
+        conn = self._checkout()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        except errors.OperationalError:
+            # brutt forbindelse: ikke legg den tilbake i poolen
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._release(conn)
 
-    def query(self, query: str) -> list:
+    def close(self):
         '''
-        executes a SQL query and returns the result
+        Close all idle connections
         '''
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
 
 if __name__ == "__main__":
         # test database connection
@@ -39,5 +156,3 @@ if __name__ == "__main__":
 
         except mysql.connector.Error as err:
             print(f"Error: {err}")
-
-
@@ -14,25 +14,45 @@ Exposed tools (examples):
     - get_all_course_titles / get_course_ID / get_datafields_values
     - get_study_program_courseIDs
     - get_study_program_location
+    - search_catalogue
+    - get_snapshot_stats
+    - get_cache_stats (not with --snapshot)
 
 Notes:
+    - Tools are registered as async variants (async_tools.py): the blocking
+      queries run on a bounded thread pool, never on the event loop thread.
+    - Results are cached (result_cache.py) until the next ingestion bumps
+      the catalogue_version stamp.
+    - With --snapshot the whole catalogue is kept in memory
+      (catalogue_snapshot.py) and every tool is answered without a query;
+      the snapshot is reloaded when catalogue_version changes.
+    - search_catalogue ranks programs and courses with BM25 over an inverted
+      index (catalogue_search.py), built from the snapshot and updated for
+      changed documents when it is reloaded. Without --snapshot the snapshot
+      is only loaded on the first search and refreshed by later searches, with
+      no background thread.
     - Tools should validate inputs and avoid returning non-JSON types.
     - Ensure parameterized queries are used to prevent SQL injection.
 """
 
 from fastmcp import FastMCP
+import argparse
 import asyncio
 from database_connection import DBConnection
-from study_program_tools import TableStudyPrograms
-from courses_tools import TableCourses
-from courseid_lookup_tools import TableStudyCoursesLookup
-from location_lookup_tools import TableStudyProgramLocationLookup
+from async_tools import (AsyncTableCourses, AsyncTableStudyCoursesLookup, AsyncTableStudyProgramLocationLookup,
+                         AsyncTableStudyPrograms, BoundedExecutor)
+from result_cache import ResultCache
+from catalogue_snapshot import (SnapshotCourses, SnapshotStore, SnapshotStudyCoursesLookup,
+                                SnapshotStudyProgramLocationLookup, SnapshotStudyPrograms)
+from catalogue_search import CatalogueSearch
 
 DATABASE = "fagskolen"
 STUDY_PROGRAM_TABLE = "study_programs"
 COURSES_TABLE = "courses"
 STUDY_PROGRAM_COURSE_ID_TABLE = "lookuptalbe_study_course"
 STUDY_PROGRAM_LOCATION_TABLE = "study_place"
+# antall databaseforbindelser verktøyene deler
+DB_POOL_SIZE = 8
 
 mcp = FastMCP(name="MyServer")
 
@@ -41,11 +61,41 @@ async def main():
     await mcp.run_async(transport="http", port=8001)
 
 if __name__ == "__main__":
-    # establish database connection
-    db_conn = DBConnection()
+    parser = argparse.ArgumentParser(description="MCP server for Fagskolen i Viken")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="svar fra et snapshot av katalogen i minnet i stedet for spørringer mot databasen")
+    args = parser.parse_args()
+
+    # establish pool of database connections
+    db_conn = DBConnection(pool_size=DB_POOL_SIZE)
+
+    # katalogen i minnet; søkeindeksen bygges fra snapshotet og oppdateres med endrede dokumenter
+    store = SnapshotStore(db_conn, DATABASE)
+    search = CatalogueSearch(store)
+    mcp.tool(store.get_snapshot_stats)
+
+    if args.snapshot:
+        # lastes ved oppstart og på nytt i bakgrunnen når catalogue_version endres
+        store.start()
+        mcp.tool(search.search_catalogue)
+        study_programs = SnapshotStudyPrograms(store)
+        courses = SnapshotCourses(store)
+        courseid_lookup = SnapshotStudyCoursesLookup(store)
+        location_lookup = SnapshotStudyProgramLocationLookup(store)
+    else:
+        # én tråd per databaseforbindelse; spørringene blokkerer ikke event-loopen
+        executor = BoundedExecutor(max_workers=DB_POOL_SIZE)
+        # svar fra verktøyene caches til neste innlesing endrer katalogen
+        cache = ResultCache(db_conn, DATABASE)
+        mcp.tool(cache.get_cache_stats)
+        # ingen bakgrunnstråd: snapshotet lastes ved første søk, og søket kjører i trådpoolen
+        mcp.tool(executor.wrap(search.search_catalogue))
+        study_programs = AsyncTableStudyPrograms(db_conn, f"{DATABASE}.{STUDY_PROGRAM_TABLE}", executor, cache)
+        courses = AsyncTableCourses(db_conn, f"{DATABASE}.{COURSES_TABLE}", executor, cache)
+        courseid_lookup = AsyncTableStudyCoursesLookup(db_conn, f"{DATABASE}.{STUDY_PROGRAM_COURSE_ID_TABLE}", executor, cache)
+        location_lookup = AsyncTableStudyProgramLocationLookup(db_conn, f"{DATABASE}.{STUDY_PROGRAM_LOCATION_TABLE}", executor, cache)
 
     # add methods as tools for study programs
-    study_programs = TableStudyPrograms(db_conn, f"{DATABASE}.{STUDY_PROGRAM_TABLE}")
     mcp.tool(study_programs.get_number_of_study_programs)
     mcp.tool(study_programs.get_study_program_categories)
     mcp.tool(study_programs.get_category_study_programs)
@@ -54,7 +104,6 @@ if __name__ == "__main__":
     mcp.tool(study_programs.get_study_program_datafields_values)
 
     # add methods as tools for courses
-    courses = TableCourses(db_conn, f"{DATABASE}.{COURSES_TABLE}")
     mcp.tool(courses.get_number_of_courses)
     mcp.tool(courses.get_all_course_titles)
     mcp.tool(courses.get_course_ID)
@@ -62,12 +111,9 @@ if __name__ == "__main__":
     mcp.tool(courses.get_course_datafields_values)
     
     # add methods as tools for study program course lookup
-    courseid_lookup = TableStudyCoursesLookup(db_conn, f"{DATABASE}.{STUDY_PROGRAM_COURSE_ID_TABLE}")
     mcp.tool(courseid_lookup.get_study_program_courseIDs)
 
     # add methods as tools for study program location lookup
-    location_lookup = TableStudyProgramLocationLookup(db_conn, f"{DATABASE}.{STUDY_PROGRAM_LOCATION_TABLE}")
     mcp.tool(location_lookup.get_study_program_location)
 
     asyncio.run(main())
-    
\ No newline at end of file
@@ -0,0 +1,156 @@
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import mysql.connector
+from database_connection import DBConnection
+
+"""
+Versioned read-through cache for the results of the MCP tools
+
+Results are cached per tool and arguments, evicted least-recently-used when
+the cache holds more than max_entries results or max_bytes of (JSON-encoded)
+results. The catalogue only changes when Push2SQL runs, and every ingestion
+bumps the version stamp in the catalogue_version table: the cache reads the
+stamp at most every version_check seconds and drops all results when it has
+changed. Without the table (an older schema) results expire after
+fallback_ttl seconds instead.
+
+Only "success" and "not_found" results are cached, never errors.
+"""
+
+MAX_ENTRIES = 2048
+MAX_BYTES = 32 * 1024 * 1024
+VERSION_CHECK = 2.0
+FALLBACK_TTL = 60.0
+
+
+class ResultCache:
+    def __init__(self, conn: DBConnection, database: str = "fagskolen", max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES, version_check: float = VERSION_CHECK, fallback_ttl: float = FALLBACK_TTL):
+        self.conn = conn
+        self.version_table = f"{database}.catalogue_version"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_check = version_check
+        self.fallback_ttl = fallback_ttl
+        # nøkkel -> (resultat, størrelse i bytes)
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.version = None
+        self._checked_at = 0.0
+        self._cleared_at = time.monotonic()
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def version_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.version_check
+
+    def check_version(self):
+        '''
+        Read the catalogue version stamp and drop all results if it has changed (blocking query)
+        '''
+        try:
+            result = self.conn.query(f"SELECT version FROM {self.version_table} WHERE id = 1")
+            version = int(result[0][0]) if result else 0
+        except mysql.connector.Error:
+            version = None
+        now = time.monotonic()
+        with self._lock:
+            self._checked_at = now
+            stale = version != self.version or (version is None and now - self._cleared_at >= self.fallback_ttl)
+            if stale:
+                if self._entries:
+                    self.counts["invalidations"] += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._cleared_at = now
+                self.version = version
+
+    @staticmethod
+    def key(tool: str, args: tuple, kwargs: dict) -> str:
+        return tool + json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def get(self, key: str):
+        '''
+        Return (True, result) on a hit, (False, None) on a miss
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counts["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.counts["hits"] += 1
+            return True, entry[0]
+
+    def put(self, key: str, result: dict, version):
+        '''
+        Store result if it was computed for the current version
+        '''
+        if not isinstance(result, dict) or result.get("status") not in ("success", "not_found"):
+            return
+        size = len(key) + len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.counts["evictions"] += 1
+
+    def wrap(self, name: str, method, executor):
+        '''
+        Return an async tool that answers from the cache and runs method on executor on a miss
+        '''
+        @functools.wraps(method)
+        async def tool(*args, **kwargs):
+            if self.version_due():
+                # bare ett kall sjekker versjonen; de andre bruker cachen så lenge
+                self._checked_at = time.monotonic()
+                await executor.run(self.check_version)
+            key = self.key(name, args, kwargs)
+            hit, result = self.get(key)
+            if hit:
+                return result
+            version = self.version
+            result = await executor.run(method, *args, **kwargs)
+            self.put(key, result, version)
+            return result
+        return tool
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return {
+                **self.counts,
+                "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "version": self.version,
+            }
+
+    def get_cache_stats(self) -> dict:
+        """
+        One-line: Return hit rate and size of the tool result cache.
+
+        Parameters:
+            None
+
+        Returns:
+            dict: {"status":"success", "result": {"hits": int, "misses": int, "hit_rate": float,
+                   "entries": int, "bytes": int, "evictions": int, "invalidations": int, "version": int|None}}
+
+        Example:
+            {"status":"success","result":{"hits":120,"misses":8,"hit_rate":0.9375,"entries":8}}
+        """
+        return {"status":"success", "result": self.stats()}
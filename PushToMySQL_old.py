@@ -3,6 +3,7 @@ import json
 import argparse
 from glob import glob
 from typing import Dict, Any
+import sys
 
 import mysql.connector
 from mysql.connector import errors as mysql_errors
@@ -11,6 +12,9 @@ try:
 except Exception:
 	pymysql = None
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Scraping'))
+import corpus_reader
+
 
 def connect_db(host, user, password, database):
 	# Prefer pymysql (more flexible auth) when available
@@ -49,24 +53,18 @@ def upsert_study_place(cursor, location_id: int, location_name: str):
 
 
 def collect_all_locations(files: list) -> dict:
-	"""Scan all JSON files and collect unique locations."""
+	"""Scan all JSON files and collect unique locations (streams the study programs only)."""
 	locations = {}
-	for filepath in files:
-		try:
-			with open(filepath, 'r', encoding='utf-8') as f:
-				data = json.load(f)
-			for prog in data.get('study_programs', []):
-				loc = prog.get('study_location') or {}
-				if isinstance(loc, dict):
-					for loc_key, loc_name in loc.items():
-						try:
-							loc_id = int(loc_key)
-							if loc_id not in locations and loc_name:
-								locations[loc_id] = loc_name
-						except (ValueError, TypeError):
-							pass
-		except Exception:
-			pass
+	for _, prog, _ in corpus_reader.iter_records(files, kinds={'program'}, on_error=lambda path, e: None):
+		loc = prog.get('study_location') or {}
+		if isinstance(loc, dict):
+			for loc_key, loc_name in loc.items():
+				try:
+					loc_id = int(loc_key)
+					if loc_id not in locations and loc_name:
+						locations[loc_id] = loc_name
+				except (ValueError, TypeError):
+					pass
 	return locations
 
 
@@ -144,11 +142,11 @@ def main():
 	if args.dry_run:
 		print('Dry run: will parse and show counts')
 		total_courses = total_programs = 0
-		for fp in files:
-			with open(fp, 'r', encoding='utf-8') as f:
-				d = json.load(f)
-			total_courses += len(d.get('courses', []))
-			total_programs += len(d.get('study_programs', []))
+		for kind, _, _ in corpus_reader.iter_records(files):
+			if kind == 'course':
+				total_courses += 1
+			else:
+				total_programs += 1
 		print(f'Found {total_courses} courses and {total_programs} study_programs in {len(files)} files')
 		return
 
@@ -7,10 +7,28 @@ Outputs result as JSON showing the data structure.
 import json
 from pathlib import Path
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from typing import Dict, List, Optional, Any
-from urllib.request import Request, urlopen
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
+import corpus_manifest
+import corpus_reader
+import course_cache
+import http_cache
+
+# antall tråder som henter emnesider samtidig for ett studie
+COURSE_FETCH_WORKERS = 8
+# maks antall samtidige forespørsler mot samme vert (på tvers av alle tråder)
+MAX_REQUESTS_PER_HOST = 4
+# parser-backend for BeautifulSoup ("lxml" eller "html.parser")
+DEFAULT_PARSER = "lxml"
+
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+# flere uttrekkstråder kan legge til linjer i samme JSONL-fil
+_jsonl_lock = threading.Lock()
 
 study_locations = {
     0: "Kongsberg",
@@ -45,21 +63,121 @@ study_types = {
 }
 
 
+class RegionStrainer(SoupStrainer):
+    """SoupStrainer that keeps every element (with its subtree) where keep(name, attrs) is true.
+    
+    Implements both the bs4 < 4.13 (search_tag) and >= 4.13 (allow_*_creation) hooks.
+    """
+    
+    def __init__(self, keep):
+        super().__init__()
+        self.keep = keep
+    
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, Tag):
+            return markup_name if self.keep(markup_name.name, markup_name.attrs) else None
+        return self.keep(markup_name, markup_attrs or {})
+    
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.keep(name, attrs or {})
+    
+    def allow_string_creation(self, string):
+        # tekst utenfor beholdte elementer forkastes
+        return False
+
+
+def _class_string(attrs) -> str:
+    classes = attrs.get('class') or ''
+    return " ".join(classes) if isinstance(classes, list) else classes
+
+
+def keep_study_region(name, attrs) -> bool:
+    """Study page regions used by extract_study_info/extract_courses."""
+    if name in ('h2', 'h3', 'p'):
+        return True
+    if name == 'link':
+        return 'canonical' in (attrs.get('rel') or '')
+    classes = _class_string(attrs)
+    return 'study-detail' in classes or 'study-course' in classes or 'field--name-field-' in classes
+
+
+def keep_course_region(name, attrs) -> bool:
+    """Course page regions used by parse_course_page (facts and learning outcomes)."""
+    return attrs.get('id') == 'facts-containter' or 'field-learning-outcome' in _class_string(attrs)
+
+
+STUDY_PAGE_STRAINER = RegionStrainer(keep_study_region)
+COURSE_PAGE_STRAINER = RegionStrainer(keep_course_region)
+
+
+def host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Return the shared semaphore limiting concurrent requests to the host of `url`."""
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        return _host_semaphores[host]
+
+
 class StudyDataExtractor:
     """Extract and structure study program information from HTML."""
     
-    def __init__(self, html_content: str):
-        """Initialize with HTML content."""
+    def __init__(self, html_content: str, max_workers: int = COURSE_FETCH_WORKERS,
+                 cache: Optional[course_cache.CourseCache] = None,
+                 parser: str = DEFAULT_PARSER, partial: bool = True):
+        """Initialize with HTML content.
+        
+        Args:
+            html_content: HTML of the study page.
+            max_workers: Number of course pages fetched concurrently (1 = sequential).
+            cache: Course detail cache; defaults to the process-wide cache.
+            parser: BeautifulSoup parser backend ("lxml" or "html.parser").
+            partial: Only build the tree for the regions the extractor reads
+                (STUDY_PAGE_STRAINER / COURSE_PAGE_STRAINER).
+        """
         self.html_content = html_content
+        self.parser = parser
+        self.partial = partial
+        self.max_workers = max_workers
+        self.cache = cache
         self.soup = None
-        self.study_data = {}
-        self.courses_data = []
+        self.sections: Dict[str, Optional[str]] = {}
+        # Resultater caches på instansen slik at DataFrame- og JSON-eksport
+        # deler samme uttrekk (og emnesidene bare hentes én gang).
+        self.study_data = None
+        self.courses_data = None
+        self.structured_data = None
+        # emnesider som ikke kunne hentes (prøves igjen ved neste kjøring)
+        self.failed_courses: List[str] = []
         self.parse_html()
         
+    @property
+    def study_info(self) -> Dict[str, Any]:
+        """Study program information, extracted on first access."""
+        if self.study_data is None:
+            self.study_data = self.extract_study_info()
+        return self.study_data
+    
+    @property
+    def courses(self) -> List[Dict[str, Any]]:
+        """Course information (including course pages), extracted on first access."""
+        if self.courses_data is None:
+            self.courses_data = self.extract_courses()
+        return self.courses_data
+    
+    def clear_cache(self):
+        """Forget cached extraction results so the next access extracts again."""
+        self.study_data = None
+        self.courses_data = None
+        self.structured_data = None
+        self.failed_courses = []
+    
     def parse_html(self):
         """Parse HTML content."""
         try:
-            self.soup = BeautifulSoup(self.html_content, 'html.parser')
+            strainer = STUDY_PAGE_STRAINER if self.partial else None
+            self.soup = BeautifulSoup(self.html_content, self.parser, parse_only=strainer)
+            self.sections = index_sections(self.soup)
             print("✓ HTML content parsed successfully")
         except Exception as e:
             print(f"✗ Error parsing HTML: {e}")
@@ -79,32 +197,41 @@ class StudyDataExtractor:
             return None
     
     def extract_section_text(self, heading_text: str) -> Optional[str]:
-        """Extract section text following a heading."""
+        """Extract section text following a heading (looked up in the section index)."""
+        return self.sections.get(heading_text)
+    
+    def fetch_course_details(self, course_url: str) -> Dict[str, Any]:
+        """Fetch a course page and extract Emnekode, Studienivå and learning outcomes.
+        
+        Raises on network errors so that failed pages are not cached. If the
+        server answers 304 and the details are still cached (even if expired),
+        the page is not parsed again.
+        """
+        # begrens antall samtidige forespørsler mot samme vert
+        with host_semaphore(course_url):
+            page = http_cache.fetch(course_url)
+        if page.not_modified:
+            cached = (self.cache or course_cache.get_cache()).peek(course_url)
+            if cached is not None:
+                return cached
+        return parse_course_page(page.text, self.parser, self.partial)
+    
+    def course_details(self, course_url: str) -> Dict[str, Any]:
+        """Return course details from the cache, fetching the page on a miss."""
+        cache = self.cache or course_cache.get_cache()
         try:
-            heading = None
-            for h in self.soup.find_all(['h2', 'h3']):
-                if h.get_text(separator=" | ",strip=True) == heading_text:
-                    heading = h
-                    break
-            
-            if not heading:
-                return None
-            
-            parts = []
-            for el in heading.find_all_next():
-                if el.name in ['h2', 'h3'] and el != heading:
-                    break
-                if el.name in ['p']:
-                    text = el.get_text(separator=" | ",strip=True)
-                    if text:
-                        parts.append(text)
-            
-            return "\n".join(parts) if parts else None
-        except Exception:
-            return None
+            return cache.get_or_fetch(course_url, self.fetch_course_details)
+        except Exception as e:
+            print(f"  Warning: Error extracting course details from {course_url}: {e}")
+            self.failed_courses.append(course_url)
+            return empty_course_details()
     
     def extract_courses(self) -> List[Dict[str, Any]]:
-        """Extract course/subject information from course pages."""
+        """Extract course/subject information from course pages.
+        
+        Course pages are fetched concurrently (bounded by `max_workers` and
+        MAX_REQUESTS_PER_HOST), but the returned list keeps the page order.
+        """
         courses = []
         try:
             # Find course links
@@ -123,67 +250,28 @@ class StudyDataExtractor:
                     print(ValueError)
                     course_points_Int = None
 
-                # Extract course details from the course page
-                course_id = None
-                study_level = None
-                learning_outcomes = {
-                    'knowledge': None,
-                    'skills': None,
-                    'competence': None
-                }
-                
-                # Fetch course page to extract additional info
-                if course_url:
-                    try:
-                        req = Request(course_url, headers={"User-Agent": "Mozilla/5.0"})
-                        course_html = urlopen(req).read().decode("utf-8", errors="ignore")
-                        course_soup = BeautifulSoup(course_html, 'html.parser')
-                        
-                        # Extract course ID (Emnekode) from facts container
-                        facts_container = course_soup.select_one('div#facts-containter')
-                        if facts_container:
-                            # Find all facts and look for Emnekode
-                            facts_items = facts_container.find_all('li')
-                            for fact_item in facts_items:
-                                label = fact_item.select_one('.facts-label')
-                                item = fact_item.select_one('.facts-item')
-                                if label and item:
-                                    label_text = label.get_text(separator=" | ",strip=True)
-                                    item_text = item.get_text(separator=" | ",strip=True)
-                                    
-                                    if 'Emnekode' in label_text:
-                                        course_id = item_text
-                                    elif 'Studienivå' in label_text:
-                                        study_level = item_text
-                        
-                        # Extract learning outcomes
-                        knowledge_elem = course_soup.select_one('div.field-learning-outcome-knowledge.label-above')
-                        if knowledge_elem:
-                            learning_outcomes['knowledge'] = knowledge_elem.get_text(separator=" ",strip=True)
-                        
-                        skills_elem = course_soup.select_one('div.field-learning-outcome-skills.label-above')
-                        if skills_elem:
-                            learning_outcomes['skills'] = skills_elem.get_text(separator=" ",strip=True)
-                        
-                        competence_elem = course_soup.select_one('div.field-learning-outcome-reflec.label-above')
-                        if competence_elem:
-                            learning_outcomes['competence'] = competence_elem.get_text(separator=" ",strip=True)
-                    
-                    except Exception as e:
-                        print(f"  Warning: Error extracting course details from {course_url}: {e}")
-
+                details = empty_course_details()
                 course_dict = {
-                    'id': course_id,
+                    'id': details['id'],
                     'title': course_title.get_text(separator=" | ",strip=True) if course_title else None,
                     'credits': course_points_Int,
                     'url': course_url,
-                    'study_level': study_level,
-                    'learning_outcomes': learning_outcomes
+                    'study_level': details['study_level'],
+                    'learning_outcomes': details['learning_outcomes']
                 }
                 courses.append(course_dict)
         except Exception as e:
             print(f"  Warning: Error extracting courses: {e}")
         
+        # Fetch course pages to extract additional info. executor.map returns
+        # results in submission order, so the course order matches the page.
+        fetchable = [c for c in courses if c['url']]
+        if fetchable:
+            workers = max(1, min(self.max_workers, len(fetchable)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for course_dict, details in zip(fetchable, executor.map(self.course_details, [c['url'] for c in fetchable])):
+                    course_dict.update(details)
+        
         return courses
     
     def extract_study_info(self) -> Dict[str, Any]:
@@ -283,7 +371,8 @@ class StudyDataExtractor:
                 study_info['study_url'] = canonical.get('href')
             
             # Police certificate - check in admission section
-            admission_text = self.soup.get_text(separator=" | ",strip=True)
+            # (med delvis parsing finnes ikke hele siden i treet, så søk i rå HTML)
+            admission_text = self.html_content if self.partial else self.soup.get_text(separator=" | ",strip=True)
             study_info['police_certificate'] = None if 'politiattest' not in admission_text.lower() else 'Sjekk opptakskrav'
             
         except Exception as e:
@@ -292,9 +381,15 @@ class StudyDataExtractor:
         return study_info
     
     def structure_for_database(self) -> Dict[str, Any]:
-        """Structure all extracted data for database storage."""
-        study_info = self.extract_study_info()
-        courses = self.extract_courses()
+        """Structure all extracted data for database storage.
+        
+        The result is computed once per instance and shared by all exports.
+        """
+        if self.structured_data is not None:
+            return self.structured_data
+        
+        study_info = self.study_info
+        courses = self.courses
         
         # Create structured data object
         data_structure = {
@@ -322,6 +417,7 @@ class StudyDataExtractor:
             'courses': courses
         }
         
+        self.structured_data = data_structure
         return data_structure
     
     def to_dataframes(self):
@@ -340,28 +436,51 @@ class StudyDataExtractor:
         
         return study_df, courses_df
     
-    def to_json(self, output_file: str = 'study_data_structure.json'):
-        """Export structured data to JSON file."""
+    def json_path(self, output_file: str = 'study_data_structure.json', jsonl: bool = False) -> Path:
+        """Path of the JSON file to_json() writes for this study (the shared JSONL file with `jsonl`)."""
         data = self.structure_for_database()
         path = os.path.join(os.path.dirname(__file__))+"\\"
         folder = "json_for_processing/"
         
-        # Convert None to null in JSON and pretty print
-        json_data = json.dumps(data, ensure_ascii=False, indent=2)
-        
         # Define the full path to the file
-        if data['study_programs'][0]['id'] is not None:
+        if jsonl:
+            output_file = path + folder + corpus_reader.JSONL_NAME
+        elif data['study_programs'][0]['id'] is not None:
             output_file = path + folder + data['study_programs'][0]['id'] + ".json"
         else:
             output_file = path + folder + output_file
+        return Path(output_file)
+    
+    def to_json(self, output_file: str = 'study_data_structure.json', jsonl: bool = False):
+        """Export structured data to JSON file.
+
+        With `jsonl`, the document is appended as one line to the corpus JSONL
+        file instead (see corpus_reader.py). The document is recorded in the
+        corpus manifest when one is configured.
+        """
+        data = self.structure_for_database()
+        
+        # Convert None to null in JSON and pretty print
+        json_data = json.dumps(data, ensure_ascii=False, indent=None if jsonl else 2)
         
-        output_file = Path(output_file)
+        output_file = self.json_path(output_file, jsonl)
         # sjekk om mappe eksisterer, hvis ikke opprett.
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(json_data)
+            manifest = corpus_manifest.get_manifest()
+            if jsonl:
+                with _jsonl_lock:
+                    with open(output_file, 'ab') as f:
+                        offset = f.tell()
+                        f.write((json_data + "\n").encode('utf-8'))
+                    if manifest:
+                        manifest.record(str(output_file), json_data, data, offset)
+            else:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(json_data)
+                if manifest:
+                    manifest.record(str(output_file), json_data, data)
             print(f"✓ JSON file created: {output_file}")
             return json_data
         except Exception as e:
@@ -384,6 +503,81 @@ class StudyDataExtractor:
         
         return study_df, courses_df
 
+def index_sections(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+    """Map each h2/h3 heading text to the text of the <p> elements following it.
+    
+    Built in one document-order traversal. A section runs until the next
+    heading; if a heading text occurs more than once, the first one wins.
+    """
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for el in soup.find_all(['h2', 'h3', 'p']):
+        if el.name != 'p':
+            heading_text = el.get_text(separator=" | ",strip=True)
+            if heading_text == current:
+                continue
+            current = heading_text if heading_text not in sections else None
+            if current is not None:
+                sections[current] = []
+        elif current is not None:
+            text = el.get_text(separator=" | ",strip=True)
+            if text:
+                sections[current].append(text)
+    return {heading: "\n".join(parts) if parts else None for heading, parts in sections.items()}
+
+
+def empty_course_details() -> Dict[str, Any]:
+    """Course details used when a course page is missing or could not be fetched."""
+    return {
+        'id': None,
+        'study_level': None,
+        'learning_outcomes': {
+            'knowledge': None,
+            'skills': None,
+            'competence': None
+        }
+    }
+
+
+def parse_course_page(course_html: str, parser: str = DEFAULT_PARSER, partial: bool = True) -> Dict[str, Any]:
+    """Extract Emnekode, Studienivå and learning outcomes from course page HTML."""
+    details = empty_course_details()
+    course_soup = BeautifulSoup(course_html, parser, parse_only=COURSE_PAGE_STRAINER if partial else None)
+    
+    # Extract course ID (Emnekode) from facts container
+    facts_container = course_soup.select_one('div#facts-containter')
+    if facts_container:
+        # Find all facts and look for Emnekode
+        facts_items = facts_container.find_all('li')
+        for fact_item in facts_items:
+            label = fact_item.select_one('.facts-label')
+            item = fact_item.select_one('.facts-item')
+            if label and item:
+                label_text = label.get_text(separator=" | ",strip=True)
+                item_text = item.get_text(separator=" | ",strip=True)
+                
+                if 'Emnekode' in label_text:
+                    details['id'] = item_text
+                elif 'Studienivå' in label_text:
+                    details['study_level'] = item_text
+    
+    # Extract learning outcomes
+    learning_outcomes = details['learning_outcomes']
+    knowledge_elem = course_soup.select_one('div.field-learning-outcome-knowledge.label-above')
+    if knowledge_elem:
+        learning_outcomes['knowledge'] = knowledge_elem.get_text(separator=" ",strip=True)
+    
+    skills_elem = course_soup.select_one('div.field-learning-outcome-skills.label-above')
+    if skills_elem:
+        learning_outcomes['skills'] = skills_elem.get_text(separator=" ",strip=True)
+    
+    competence_elem = course_soup.select_one('div.field-learning-outcome-reflec.label-above')
+    if competence_elem:
+        learning_outcomes['competence'] = competence_elem.get_text(separator=" ",strip=True)
+    
+    return details
+
+
 def match_location_and_studyType(object):
     global study_locations, study_types
     object = object.split(sep=" | ") # split ut lokasjonene. Studietype splittes senere.
@@ -418,19 +612,20 @@ def match_location_and_studyType(object):
             
     return study_location, study_type
 
+def extract_study(url: str) -> StudyDataExtractor:
+    """Fetch a study page and return an extractor for it. Raises on fetch errors."""
+    html_content = http_cache.fetch(url).text
+    return StudyDataExtractor(html_content)
+
 def extract(url):
-    # Fetch HTML from the URL
+    # Fetch HTML from the URL and initialize extractor with HTML content
     try:
         #print(f"Fetching data from URL: {url}")
-        req = Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        html_content = urlopen(req).read().decode("utf-8", errors="ignore")
+        extractor = extract_study(url)
         #print("✓ Data fetched successfully from URL\n")
     except Exception as e:
         print(f"✗ Error fetching URL: {e}")
-        exit(1)
-    
-    # Initialize extractor with HTML content
-    extractor = StudyDataExtractor(html_content)
+        return None
     
     # Load and process
     if extractor.soup:
@@ -443,5 +638,6 @@ def extract(url):
         extractor.to_json()
         
         #print("\n✓ Data extraction complete!")
+    return extractor
 
 # Test commit
\ No newline at end of file
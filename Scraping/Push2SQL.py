@@ -3,10 +3,29 @@ Load JSON files from the `json_for_processing` folder and push data
 into the MySQL database schema defined in `e-l/databasesetup.sql`.
 
 Behavior:
-- Loops all .json files in `json_for_processing` next to this script.
+- Streams all .json and .jsonl files in `json_for_processing` next to this
+  script, one study document at a time (see corpus_reader.py).
 - Inserts/updates `courses`, `study_place`, `study_programs`, and
   `lookuptalbe_study_course` tables.
 - Deduplicates locations and courses.
+- With --changed-only, files whose content is unchanged since the last
+  push (see change_detection.py) are skipped; the corpus manifest
+  (corpus_manifest.py) picks them out without opening the files.
+- Rows are collected per table and written as multi-row upserts of
+  --batch-size rows (--batch-size 0 = one statement per row).
+- --bulk rebuilds the four tables from scratch: rows are written to TSV
+  files and loaded with LOAD DATA LOCAL INFILE, with foreign-key checks off
+  during the load and verified before commit.
+- --staging writes into shadow tables (`courses__staging`, ...; see
+  table_swap.py) and swaps them in with one atomic RENAME TABLE, so readers
+  never see a half-written catalogue. The replaced tables are kept as
+  `*__previous`; --rollback swaps them back.
+- Every write bumps `catalogue_version`, which tells readers such as the MCP
+  server's result cache that the catalogue changed.
+- --workers N parses the files in N processes; --connections M writes each
+  table in M partitions over M connections, in foreign-key order. New
+  study_place rows are assigned their ids in the main process before any
+  write, so the workers never share the location id counter.
 
 Usage:
   python push2sql_ny.py --config path/to/config.cnf
@@ -23,11 +42,19 @@ from __future__ import annotations
 
 import argparse
 import configparser
-import json
+import contextlib
+import io
 import os
 import sys
-from glob import glob
-from typing import Dict, Any, List, Optional, Tuple
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Collection, Dict, Any, List, Optional, Tuple
+
+import change_detection
+import corpus_manifest
+import corpus_reader
+import table_swap
 
 try:
     import mysql.connector
@@ -39,6 +66,16 @@ except Exception as e:  # pragma: no cover - user will install if missing
 HOSTNAME = "127.0.0.1"
 USERNAME = "root"
 PASSWORD = "admin"
+# antall rader per INSERT-setning i batch-modus
+DEFAULT_BATCH_SIZE = 500
+
+COURSE_COLUMNS = ["course_id", "course_title", "credits", "url", "study_level",
+                  "learned_knowledge", "learned_skills", "learned_competence"]
+PROGRAM_COLUMNS = ["study_title", "study_description", "study_category", "location_id", "credits", "study_language",
+                   "study_level", "why_choose", "learnings", "teaching_format", "mandatory_attendance",
+                   "police_certificate", "career_opportunities", "contact_info", "study_url", "course_id"]
+LOCATION_COLUMNS = ["location_id", "location_name"]
+LOOKUP_COLUMNS = ["study_title", "course_id"]
 
 def find_config_candidates(base_dir: str) -> List[str]:
     return [
@@ -77,7 +114,7 @@ def read_db_config(path: Optional[str], base_dir: str) -> Dict[str, str]:
     }
 
 
-def connect_db(conf: Dict[str, str]):
+def connect_db(conf: Dict[str, str], **kwargs):
     return mysql.connector.connect(
         host=conf.get("host", HOSTNAME),
         user=conf.get("user", USERNAME),
@@ -85,15 +122,26 @@ def connect_db(conf: Dict[str, str]):
         database=conf.get("database", "fagskolen"),
         port=int(conf.get("port", 3306)),
         autocommit=False,
+        **kwargs,
     )
 
 
 def load_json_files(folder: str) -> List[str]:
-    pattern = os.path.join(folder, "*.json")
-    return sorted(glob(pattern))
+    return corpus_reader.corpus_files(folder)
+
 
+def insert_sql(table: str, columns: List[str], rows: int = 1, update: Optional[List[str]] = None,
+               ignore: bool = False) -> str:
+    """INSERT for `rows` rows; `update` columns are overwritten on duplicate keys."""
+    placeholders = "(" + ",".join(["%s"] * len(columns)) + ")"
+    sql = (f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) "
+           f"VALUES {','.join([placeholders] * rows)}")
+    if update:
+        sql += " ON DUPLICATE KEY UPDATE " + ", ".join(f"{c}=VALUES({c})" for c in update)
+    return sql
 
-def ensure_location(cursor, name: str, existing: Dict[str, int], next_id_ref: List[int]) -> int:
+
+def ensure_location(cursor, name: str, existing: Dict[str, int], next_id_ref: List[int], writer: Optional["BatchWriter"] = None) -> int:
     # return existing id or insert a new one
     if not name:
         return None
@@ -102,173 +150,681 @@ def ensure_location(cursor, name: str, existing: Dict[str, int], next_id_ref: Li
         return existing[key]
 
     new_id = next_id_ref[0]
-    cursor.execute(
-        "INSERT INTO study_place (location_id, location_name) VALUES (%s, %s)",
-        (new_id, key),
-    )
+    if writer is not None:
+        writer.add_location(new_id, key)
+    else:
+        cursor.execute(
+            "INSERT INTO study_place (location_id, location_name) VALUES (%s, %s)",
+            (new_id, key),
+        )
     existing[key] = new_id
     next_id_ref[0] += 1
     return new_id
 
 
-def upsert_course(cursor, course: Dict[str, Any]):
-    sql = (
-        "INSERT INTO courses (course_id, course_title, credits, url, study_level, learned_knowledge, learned_skills, learned_competence) "
-        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s) "
-        "ON DUPLICATE KEY UPDATE course_title=VALUES(course_title), credits=VALUES(credits), url=VALUES(url), study_level=VALUES(study_level), "
-        "learned_knowledge=VALUES(learned_knowledge), learned_skills=VALUES(learned_skills), learned_competence=VALUES(learned_competence)"
-    )
+def course_row(course: Dict[str, Any]) -> Tuple:
     learning = course.get("learning_outcomes", {})
     know = learning.get("knowledge") if isinstance(learning, dict) else None
     skills = learning.get("skills") if isinstance(learning, dict) else None
     comp = learning.get("competence") if isinstance(learning, dict) else None
-    cursor.execute(
-        sql,
-        (
-            course.get("id"),
-            course.get("title"),
-            float(course.get("credits")) if course.get("credits") is not None else None,
-            course.get("url"),
-            course.get("study_level"),
-            know,
-            skills,
-            comp,
-        ),
+    return (
+        course.get("id"),
+        course.get("title"),
+        float(course.get("credits")) if course.get("credits") is not None else None,
+        course.get("url"),
+        course.get("study_level"),
+        know,
+        skills,
+        comp,
     )
 
 
-def upsert_study_program(cursor, program: Dict[str, Any], location_id: Optional[int]):
-    sql = (
-        "INSERT INTO study_programs (study_title, study_description, study_category, location_id, credits, study_language, study_level, why_choose, learnings, teaching_format, mandatory_attendance, police_certificate, career_opportunities, contact_info, study_url, course_id) "
-        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) "
-        "ON DUPLICATE KEY UPDATE study_title=VALUES(study_title), study_description=VALUES(study_description), study_category=VALUES(study_category), location_id=VALUES(location_id), credits=VALUES(credits), study_language=VALUES(study_language), study_level=VALUES(study_level), why_choose=VALUES(why_choose), learnings=VALUES(learnings), teaching_format=VALUES(teaching_format), mandatory_attendance=VALUES(mandatory_attendance), police_certificate=VALUES(police_certificate), career_opportunities=VALUES(career_opportunities), contact_info=VALUES(contact_info), study_url=VALUES(study_url), course_id=VALUES(course_id)"
-    )
+def upsert_course(cursor, course: Dict[str, Any]):
+    cursor.execute(insert_sql("courses", COURSE_COLUMNS, update=COURSE_COLUMNS[1:]), course_row(course))
 
+
+def program_row(program: Dict[str, Any], location_id: Optional[int]) -> Tuple:
     police = program.get("police_certificate")
     if police is None:
         police_val = None
     else:
         police_val = bool(police)
 
-    cursor.execute(
-        sql,
-        (
-            program.get("title"),
-            program.get("description"),
-            program.get("study_category"),
-            location_id,
-            float(program.get("credits")) if program.get("credits") is not None else None,
-            program.get("language"),
-            program.get("level"),
-            program.get("why_choose"),
-            program.get("learnings"),
-            program.get("teaching_format"),
-            program.get("mandatory_attendance"),
-            police_val,
-            program.get("career_opportunities"),
-            program.get("contact_info"),
-            program.get("study_url"),
-            None,
-        ),
+    return (
+        program.get("title"),
+        program.get("description"),
+        program.get("study_category"),
+        location_id,
+        float(program.get("credits")) if program.get("credits") is not None else None,
+        program.get("language"),
+        program.get("level"),
+        program.get("why_choose"),
+        program.get("learnings"),
+        program.get("teaching_format"),
+        program.get("mandatory_attendance"),
+        police_val,
+        program.get("career_opportunities"),
+        program.get("contact_info"),
+        program.get("study_url"),
+        None,
     )
 
 
+def upsert_study_program(cursor, program: Dict[str, Any], location_id: Optional[int]):
+    cursor.execute(insert_sql("study_programs", PROGRAM_COLUMNS, update=PROGRAM_COLUMNS), program_row(program, location_id))
+
+
 def insert_lookup(cursor, study_title: str, course_id: str):
-    cursor.execute(
-        "INSERT IGNORE INTO lookuptalbe_study_course (study_title, course_id) VALUES (%s, %s)",
-        (study_title, course_id),
-    )
+    cursor.execute(insert_sql("lookuptalbe_study_course", LOOKUP_COLUMNS, ignore=True), (study_title, course_id))
+
+
+class BatchWriter:
+    """Collects rows per table and writes them as multi-row INSERT statements.
+
+    Upsert semantics are the same as the row-by-row functions: courses and
+    programs are upserted (the last version of a key wins), locations are
+    inserted and lookups use INSERT IGNORE. Tables are flushed in foreign-key
+    order, automatically once `batch_size` rows are pending.
+    """
+
+    def __init__(self, cursor, batch_size: int = DEFAULT_BATCH_SIZE, suffix: str = ""):
+        self.cursor = cursor
+        self.batch_size = max(1, batch_size)
+        # "__staging" skriver til skyggetabellene i stedet for de aktive
+        self.suffix = suffix
+        self.locations: Dict[int, Tuple] = {}
+        self.courses: Dict[str, Tuple] = {}
+        self.programs: Dict[str, Tuple] = {}
+        self.lookups: Dict[Tuple, None] = {}
+        self.rows = 0
+        self.statements = 0
+
+    def pending(self) -> int:
+        return len(self.locations) + len(self.courses) + len(self.programs) + len(self.lookups)
+
+    def _added(self):
+        if self.pending() >= self.batch_size:
+            self.flush()
+
+    def add_location(self, location_id: int, name: str):
+        self.locations[location_id] = (location_id, name)
+        self._added()
+
+    def add_course(self, course: Dict[str, Any]):
+        row = course_row(course)
+        # samme nøkkel to ganger: siste versjon vinner, som med ON DUPLICATE KEY UPDATE
+        self.courses.pop(row[0], None)
+        self.courses[row[0]] = row
+        self._added()
+
+    def add_program(self, program: Dict[str, Any], location_id: Optional[int]):
+        row = program_row(program, location_id)
+        self.programs.pop(row[0], None)
+        self.programs[row[0]] = row
+        self._added()
+
+    def add_lookup(self, study_title: str, course_id: str):
+        self.lookups[(study_title, course_id)] = None
+        self._added()
+
+    def _write(self, table: str, columns: List[str], rows: List[Tuple], update: Optional[List[str]] = None,
+               ignore: bool = False):
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            sql = insert_sql(table + self.suffix, columns, len(chunk), update=update, ignore=ignore)
+            self.cursor.execute(sql, [v for row in chunk for v in row])
+            self.statements += 1
+            self.rows += len(chunk)
+
+    def flush(self):
+        """Write all pending rows (study_place, courses, study_programs, lookups)."""
+        self._write("study_place", LOCATION_COLUMNS, list(self.locations.values()))
+        self._write("courses", COURSE_COLUMNS, list(self.courses.values()), update=COURSE_COLUMNS[1:])
+        self._write("study_programs", PROGRAM_COLUMNS, list(self.programs.values()), update=PROGRAM_COLUMNS)
+        self._write("lookuptalbe_study_course", LOOKUP_COLUMNS, list(self.lookups), ignore=True)
+        self.discard()
+
+    def discard(self):
+        """Drop pending rows, e.g. after a rollback."""
+        self.locations.clear()
+        self.courses.clear()
+        self.programs.clear()
+        self.lookups.clear()
+
+
+def load_locations(cur) -> Tuple[Dict[str, int], List[int]]:
+    """Return existing locations (name -> id) and the next free location id."""
+    cur.execute("SELECT location_id, location_name FROM study_place")
+    existing_locations: Dict[str, int] = {r[1]: int(r[0]) for r in cur.fetchall()}
+    cur.execute("SELECT COALESCE(MAX(location_id),0) FROM study_place")
+    row = cur.fetchone()
+    next_loc = int(row[0]) + 1 if row else 1
+    return existing_locations, [next_loc]
+
+
+_version_table_missing = False
+
+
+def bump_catalogue_version(cur):
+    """Mark the catalogue as changed for readers (committed with the caller's transaction).
+
+    Databases created before the catalogue_version table existed are written
+    as before, without a version stamp (readers then fall back to a TTL).
+    """
+    global _version_table_missing
+    if _version_table_missing:
+        return
+    try:
+        cur.execute("INSERT INTO catalogue_version (id, version) VALUES (1, 1) "
+                    "ON DUPLICATE KEY UPDATE version = version + 1")
+    except mysql.connector.Error as err:
+        if err.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        # en feilet setning avbryter ikke transaksjonen i MySQL, så dataene skrives likevel
+        _version_table_missing = True
+        print("✗ Table catalogue_version is missing (run TurbotroebbelSQL.sql); "
+              "the catalogue version is not bumped")
 
 
-def main(argv: Optional[List[str]] = None):
-    parser = argparse.ArgumentParser(description="Push JSON files to MySQL fagskolen DB")
-    parser.add_argument("--config", help="path to config.cnf (optional)")
-    parser.add_argument("--folder", help="json_for_processing folder", default=os.path.join(os.path.dirname(__file__), "json_for_processing"))
-    parser.add_argument("--dry-run", action="store_true", help="Parse only, don't write to DB")
-    args = parser.parse_args(argv)
+def open_connection(config_path: Optional[str] = None, **kwargs):
+    """Connect using config.cnf (or `config_path`), falling back to local defaults.
 
+    Extra keyword arguments go to mysql.connector.connect (e.g. allow_local_infile).
+    """
     base_dir = os.path.abspath(os.path.dirname(__file__))
-    db_conf = read_db_config(args.config, base_dir)
+    db_conf = read_db_config(config_path, base_dir)
     if not db_conf:
         print("No config found. Provide --config or create e-l/config.cnf with [mysql] section.")
         print("Attempting default local connection to database 'fagskolen' on localhost.")
         db_conf = {"host": HOSTNAME, "user":USERNAME, "password": PASSWORD, "database": "fagskolen", "port": "3306"}
+    return connect_db(db_conf, **kwargs)
+
+
+class RowCollector(BatchWriter):
+    """A BatchWriter that only collects rows (deduplicated per key), for the bulk loader."""
+
+    def __init__(self):
+        super().__init__(cursor=None)
+
+    def _added(self):
+        pass
+
+    def tables(self) -> List[Tuple[str, List[str], List[Tuple]]]:
+        """(table, columns, rows) in load order."""
+        return [
+            ("study_place", LOCATION_COLUMNS, list(self.locations.values())),
+            ("courses", COURSE_COLUMNS, list(self.courses.values())),
+            ("study_programs", PROGRAM_COLUMNS, list(self.programs.values())),
+            ("lookuptalbe_study_course", LOOKUP_COLUMNS, list(self.lookups)),
+        ]
+
+
+def tsv_value(value: Any) -> str:
+    """Format a value for LOAD DATA's default TSV format (\\N = NULL, backslash escapes)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    text = str(value)
+    return (text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+                .replace("\r", "\\r").replace("\0", "\\0"))
+
+
+def write_tsv(path: str, rows: List[Tuple]):
+    with open(path, "w", encoding="utf-8", newline="\n") as fh:
+        for row in rows:
+            fh.write("\t".join(tsv_value(v) for v in row) + "\n")
+
+
+# (beskrivelse, spørring) som teller rader med brutte fremmednøkler; {s} er tabellsuffikset
+FOREIGN_KEY_CHECKS = [
+    ("study_programs.location_id -> study_place",
+     "SELECT COUNT(*) FROM study_programs{s} p LEFT JOIN study_place{s} s ON p.location_id = s.location_id "
+     "WHERE p.location_id IS NOT NULL AND s.location_id IS NULL"),
+    ("study_programs.course_id -> courses",
+     "SELECT COUNT(*) FROM study_programs{s} p LEFT JOIN courses{s} c ON p.course_id = c.course_id "
+     "WHERE p.course_id IS NOT NULL AND c.course_id IS NULL"),
+    ("lookuptalbe_study_course.study_title -> study_programs",
+     "SELECT COUNT(*) FROM lookuptalbe_study_course{s} l LEFT JOIN study_programs{s} p ON l.study_title = p.study_title "
+     "WHERE p.study_title IS NULL"),
+    ("lookuptalbe_study_course.course_id -> courses",
+     "SELECT COUNT(*) FROM lookuptalbe_study_course{s} l LEFT JOIN courses{s} c ON l.course_id = c.course_id "
+     "WHERE c.course_id IS NULL"),
+]
+
+
+def verify_foreign_keys(cur, suffix: str = "") -> Dict[str, int]:
+    """Return the number of orphaned rows per foreign key (empty dict = all good)."""
+    violations = {}
+    for name, sql in FOREIGN_KEY_CHECKS:
+        cur.execute(sql.format(s=suffix))
+        count = cur.fetchone()[0]
+        if count:
+            violations[name] = count
+    return violations
+
+
+def bulk_load(conn, collector: RowCollector, folder: str, suffix: str = "") -> Dict[str, Tuple[int, float]]:
+    """Replace the contents of all catalogue tables with the collected rows.
+
+    Rows are written as TSV files in `folder` and loaded with LOAD DATA LOCAL
+    INFILE in one transaction. Foreign-key checks are off during the load and
+    verified afterwards; on violations the transaction is rolled back and a
+    ValueError is raised. Returns (rows, seconds) per table. `suffix` selects
+    the target tables (e.g. "__staging").
+    """
+    tables = [(table + suffix, columns, rows) for table, columns, rows in collector.tables()]
+    cur = conn.cursor()
+    timings: Dict[str, Tuple[int, float]] = {}
+    try:
+        cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+        # tøm i omvendt rekkefølge, så gjenoppbygging gir samme innhold som filene
+        for table, _, _ in reversed(tables):
+            cur.execute(f"DELETE FROM {table}")
+        for table, columns, rows in tables:
+            path = os.path.join(folder, table + ".tsv")
+            write_tsv(path, rows)
+            t0 = time.perf_counter()
+            cur.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})",
+                (path,),
+            )
+            timings[table] = (len(rows), time.perf_counter() - t0)
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        violations = verify_foreign_keys(cur, suffix)
+        if violations:
+            raise ValueError(f"foreign key violations after bulk load: {violations}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        raise
+    finally:
+        cur.close()
+    return timings
+
+
+def print_bulk_report(timings: Dict[str, Tuple[int, float]], elapsed: float):
+    for table, (rows, seconds) in timings.items():
+        print(f"  {table:<26} {rows:7d} rows  {seconds:7.2f}s  ({rows / seconds if seconds else 0:,.0f} rows/s)")
+    total = sum(rows for rows, _ in timings.values())
+    print(f"Bulk load: {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def print_row_counts(collector: RowCollector):
+    for table, _, rows in collector.tables():
+        print(f"  {table:<26} {len(rows):7d} rows")
+
+
+def run_bulk(files: List[str], config: Optional[str] = None, dry_run: bool = False, staging: bool = False,
+             workers: int = 1):
+    """Full rebuild of the catalogue tables from `files` via LOAD DATA LOCAL INFILE.
+
+    With `staging`, the rows are loaded into empty staging tables that are then swapped in.
+    """
+    started = time.perf_counter()
+    # tabellene bygges opp fra bunnen, så lokasjons-id-ene starter på nytt
+    collector, _ = collect_rows(files, workers, {}, [1])
+
+    if dry_run:
+        print_row_counts(collector)
+        print("Dry run complete; no changes written.")
+        return
+
+    conn = open_connection(config, allow_local_infile=True)
+    try:
+        if staging:
+            cur = conn.cursor()
+            table_swap.create_staging(cur)
+            cur.close()
+        with tempfile.TemporaryDirectory() as folder:
+            timings = bulk_load(conn, collector, folder, suffix=table_swap.STAGING if staging else "")
+        cur = conn.cursor()
+        if staging:
+            table_swap.swap(cur)
+        bump_catalogue_version(cur)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    print("Committed bulk load to database.")
+    if staging:
+        print("Swapped staging tables into place (previous tables kept as *__previous).")
+    print_bulk_report(timings, time.perf_counter() - started)
+
+
+def rollback_generation(config: Optional[str] = None):
+    """Put the *__previous tables back in place (and the current ones in *__previous)."""
+    conn = open_connection(config)
+    try:
+        cur = conn.cursor()
+        table_swap.rollback(cur)
+        bump_catalogue_version(cur)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    print("Rolled back to the previous catalogue tables.")
+
+
+def push_document(cur, data: Dict[str, Any], existing_locations: Dict[str, int], next_id_ref: List[int], dry_run: bool = False,
+                  skip_courses: Collection[str] = (), skip_programs: bool = False, writer: Optional[BatchWriter] = None):
+    """Upsert the courses and programs of one extracted JSON document.
+
+    `skip_courses` (course ids) and `skip_programs` leave rows that are known
+    to be unchanged alone; lookup rows are only written with the programs.
+    With a `writer`, rows are queued for batched writes instead of executed
+    one by one (call writer.flush() before committing).
+    """
+    courses = data.get("courses", []) or []
+    programs = data.get("study_programs", []) or []
+
+    # Upsert courses
+    for c in courses:
+        cid = c.get("id")
+        print("  Course:", cid)
+        if not cid:
+            # skip malformed course entries without id
+            continue
+        if cid in skip_courses:
+            continue
+        if dry_run:
+            continue
+        if writer is not None:
+            writer.add_course(c)
+        else:
+            upsert_course(cur, c)
+
+    if skip_programs:
+        return
+
+    # For each program, ensure location, insert program, then link to all courses in file
+    for p in programs:
+        loc_name = p.get("study_location") or p.get("location")
+        # normalize location value: allow string, dict, or list
+        if isinstance(loc_name, dict):
+            loc_name = loc_name.get("name") or loc_name.get("location") or next(iter(loc_name.values()), None)
+        if isinstance(loc_name, list):
+            loc_name = ", ".join(str(x) for x in loc_name)
+        loc_id = None
+        if loc_name:
+            if dry_run:
+                # simulate id assignment
+                if loc_name not in existing_locations:
+                    existing_locations[loc_name] = next_id_ref[0]
+                    next_id_ref[0] += 1
+                loc_id = existing_locations[loc_name]
+            else:
+                # ensure in DB
+                loc_id = ensure_location(cur, loc_name, existing_locations, next_id_ref, writer)
+
+        print("  Program:", p.get("id"), "-> location_id", loc_id)
+        if writer is not None:
+            writer.add_program(p, loc_id)
+        elif not dry_run:
+            upsert_study_program(cur, p, loc_id)
+
+        # create lookup rows between this program and all courses in file
+        for c in courses:
+            if not c.get("id"):
+                continue
+            if writer is not None:
+                writer.add_lookup(p.get("title"), c.get("id"))
+            elif not dry_run:
+                insert_lookup(cur, p.get("title"), c.get("id"))
+
+
+LOCATION_INDEX = PROGRAM_COLUMNS.index("location_id")
+
+
+def parse_file(path: str) -> List[Tuple[str, str, RowCollector]]:
+    """Parse one corpus file into rows (worker process); location ids are local to each document.
+
+    Returns (key, fingerprint, rows) per study document in the file.
+    """
+    parsed = []
+    for key, fp, data in corpus_reader.iter_documents([path]):
+        collector = RowCollector()
+        with contextlib.redirect_stdout(io.StringIO()):
+            push_document(None, data, {}, [1], writer=collector)
+        parsed.append((key, fp, collector))
+    return parsed
+
+
+def merge_rows(target: RowCollector, part: RowCollector, existing_locations: Dict[str, int], next_id_ref: List[int]):
+    """Add the rows of one document to `target`, replacing its local location ids with global ones."""
+    ids = {local: ensure_location(None, name, existing_locations, next_id_ref, writer=target)
+           for local, (_, name) in part.locations.items()}
+    for key, row in part.courses.items():
+        target.courses.pop(key, None)
+        target.courses[key] = row
+    for key, row in part.programs.items():
+        if row[LOCATION_INDEX] is not None:
+            row = row[:LOCATION_INDEX] + (ids[row[LOCATION_INDEX]],) + row[LOCATION_INDEX + 1:]
+        target.programs.pop(key, None)
+        target.programs[key] = row
+    target.lookups.update(part.lookups)
+
+
+def collect_rows(files: List[str], workers: int, existing_locations: Dict[str, int], next_id_ref: List[int],
+                 store: Optional[change_detection.FingerprintStore] = None) -> Tuple[RowCollector, List[Tuple[str, str]]]:
+    """Parse `files` in `workers` processes and merge the rows in file order.
+
+    All new locations get their ids here, before anything is written. With a
+    `store`, files unchanged since the last push are left out. Returns the
+    rows and the (path, fingerprint) of the files included.
+    """
+    merged = RowCollector()
+    included: List[Tuple[str, str]] = []
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        results = pool.map(parse_file, files, chunksize=max(1, len(files) // (workers * 4))) if pool else map(parse_file, files)
+        for parsed in results:
+            for key, fp, part in parsed:
+                if store is not None and store.check("json_file", key, fp) == change_detection.UNCHANGED:
+                    continue
+                included.append((key, fp))
+                merge_rows(merged, part, existing_locations, next_id_ref)
+    finally:
+        if pool:
+            pool.shutdown()
+    return merged, included
+
+
+def write_parallel(conns: List[Any], rows: RowCollector, batch_size: int, suffix: str = "") -> Tuple[int, int]:
+    """Write `rows` table by table in foreign-key order, each table split over the connections.
+
+    Every connection commits its own partition, so a failure can leave earlier
+    tables or partitions written (use --staging for an all-or-nothing swap).
+    Returns (rows, statements).
+    """
+    writers = [BatchWriter(conn.cursor(), batch_size, suffix) for conn in conns]
+    tables = [
+        ("study_place", LOCATION_COLUMNS, list(rows.locations.values()), None, False),
+        ("courses", COURSE_COLUMNS, list(rows.courses.values()), COURSE_COLUMNS[1:], False),
+        ("study_programs", PROGRAM_COLUMNS, list(rows.programs.values()), PROGRAM_COLUMNS, False),
+        ("lookuptalbe_study_course", LOOKUP_COLUMNS, list(rows.lookups), None, True),
+    ]
+
+    def write(i: int, table: str, columns: List[str], part: List[Tuple], update: Optional[List[str]], ignore: bool):
+        try:
+            writers[i]._write(table, columns, part, update=update, ignore=ignore)
+            conns[i].commit()
+        except Exception:
+            conns[i].rollback()
+            raise
+
+    try:
+        with ThreadPoolExecutor(len(conns)) as pool:
+            for table, columns, table_rows, update, ignore in tables:
+                # partisjonene har ulike nøkler; neste tabell venter til denne er skrevet
+                futures = [pool.submit(write, i, table, columns, table_rows[i::len(conns)], update, ignore)
+                           for i in range(len(conns))]
+                for future in futures:
+                    future.result()
+    finally:
+        for w in writers:
+            w.cursor.close()
+    return sum(w.rows for w in writers), sum(w.statements for w in writers)
+
+
+def run_parallel(files: List[str], config: Optional[str] = None, workers: int = 1, connections: int = 1,
+                 batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False, staging: bool = False,
+                 store: Optional[change_detection.FingerprintStore] = None):
+    """Parse `files` in `workers` processes and upsert them over `connections` DB connections."""
+    started = time.perf_counter()
+    conns = []
+    try:
+        if dry_run:
+            existing_locations, next_id_ref = {}, [1]
+        else:
+            conns = [open_connection(config) for _ in range(connections)]
+            cur = conns[0].cursor()
+            existing_locations, next_id_ref = load_locations(cur)
+            if staging:
+                table_swap.create_staging(cur, copy_live=True)
+            cur.close()
+
+        rows, included = collect_rows(files, workers, existing_locations, next_id_ref, store)
+        print(f"Parsed {len(files)} files with {workers} worker(s) in {time.perf_counter() - started:.2f}s"
+              + (f", {len(included)} changed" if store is not None else ""))
+        print_row_counts(rows)
+        if dry_run:
+            print("Dry run complete; no changes written.")
+            return
+
+        written, statements = write_parallel(conns, rows, batch_size, table_swap.STAGING if staging else "")
+        print(f"Committed changes to database over {len(conns)} connection(s).")
+        cur = conns[0].cursor()
+        if staging:
+            table_swap.swap(cur)
+            print("Swapped staging tables into place (previous tables kept as *__previous).")
+        bump_catalogue_version(cur)
+        conns[0].commit()
+        cur.close()
+        elapsed = time.perf_counter() - started
+        print(f"{written} rows in {statements} statements, {elapsed:.2f}s "
+              f"({written / elapsed if elapsed else 0:.0f} rows/s)")
+        if store is not None:
+            for key, fp in included:
+                store.commit("json_file", key, fp)
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Push JSON files to MySQL fagskolen DB")
+    parser.add_argument("--config", help="path to config.cnf (optional)")
+    parser.add_argument("--folder", help="json_for_processing folder", default=os.path.join(os.path.dirname(__file__), "json_for_processing"))
+    parser.add_argument("--dry-run", action="store_true", help="Parse only, don't write to DB")
+    parser.add_argument("--changed-only", action="store_true", help="Skip files unchanged since the last push")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per multi-row INSERT (0 = one statement per row)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Rebuild all tables from the files with LOAD DATA LOCAL INFILE")
+    parser.add_argument("--staging", action="store_true",
+                        help="Write into staging tables and swap them in atomically (keeps *__previous)")
+    parser.add_argument("--rollback", action="store_true",
+                        help="Swap the *__previous tables back in place and exit")
+    parser.add_argument("--workers", type=int, default=1, help="Processes parsing the JSON files")
+    parser.add_argument("--connections", type=int, default=1, help="DB connections writing in parallel")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.connections < 1:
+        parser.error("--workers and --connections must be at least 1")
+    if args.bulk and args.connections > 1:
+        parser.error("--bulk loads over one connection; drop --connections")
+    if args.connections > 1 and args.batch_size <= 0:
+        parser.error("--connections needs batched writes (--batch-size > 0)")
+    if args.bulk and args.changed_only:
+        parser.error("--bulk rebuilds everything and cannot be combined with --changed-only")
+    if args.staging and not args.bulk and args.batch_size <= 0:
+        parser.error("--staging needs batched writes (--batch-size > 0) or --bulk")
+
+    if args.rollback:
+        rollback_generation(args.config)
+        return
 
     files = load_json_files(args.folder)
     if not files:
         print("No JSON files found in:", args.folder)
         return
 
+    if args.bulk:
+        run_bulk(files, args.config, args.dry_run, staging=args.staging, workers=args.workers)
+        return
+
+    store = None
+    pushed: List[Tuple[str, str]] = []
+    if args.changed_only:
+        store = change_detection.get_store() or change_detection.configure()
+        manifest = corpus_manifest.get_manifest() or corpus_manifest.configure()
+        manifest.refresh(files)
+        changed = manifest.changed_files(files, store)
+        print(f"{len(files) - len(changed)} of {len(files)} files unchanged (manifest)")
+        files = changed
+
+    if args.workers > 1 or args.connections > 1:
+        run_parallel(files, args.config, args.workers, args.connections, args.batch_size,
+                     dry_run=args.dry_run, staging=args.staging, store=store)
+        return
+
     conn = None
     cur = None
+    writer = None
+    started = time.perf_counter()
     try:
         if not args.dry_run:
-            conn = connect_db(db_conf)
+            conn = open_connection(args.config)
             cur = conn.cursor()
 
             # load existing locations
-            cur.execute("SELECT location_id, location_name FROM study_place")
-            existing_locations: Dict[str, int] = {r[1]: int(r[0]) for r in cur.fetchall()}
-            cur.execute("SELECT COALESCE(MAX(location_id),0) FROM study_place")
-            row = cur.fetchone()
-            next_loc = int(row[0]) + 1 if row else 1
-            next_id_ref = [next_loc]
+            existing_locations, next_id_ref = load_locations(cur)
+            if args.staging:
+                # skyggetabellene starter som en kopi av de aktive; endringene legges oppå
+                table_swap.create_staging(cur, copy_live=True)
+                writer = BatchWriter(cur, args.batch_size, suffix=table_swap.STAGING)
+            elif args.batch_size > 0:
+                writer = BatchWriter(cur, args.batch_size)
         else:
             existing_locations = {}
             next_id_ref = [1]
 
-        for path in files:
-            print("Processing:", path)
-            with open(path, "r", encoding="utf-8") as fh:
-                data = json.load(fh)
-
-            courses = data.get("courses", []) or []
-            programs = data.get("study_programs", []) or []
-
-            # Upsert courses
-            for c in courses:
-                cid = c.get("id")
-                print("  Course:", cid)
-                if not cid:
-                    # skip malformed course entries without id
+        # ett dokument om gangen; fingeravtrykket regnes ut under lesingen
+        for key, fp, data in corpus_reader.iter_documents(files):
+            print("Processing:", key)
+            if store is not None:
+                if store.check("json_file", key, fp) == change_detection.UNCHANGED:
+                    print("  Unchanged, skipped")
                     continue
-                if not args.dry_run:
-                    upsert_course(cur, c)
-
-            # For each program, ensure location, insert program, then link to all courses in file
-            for p in programs:
-                loc_name = p.get("study_location") or p.get("location")
-                # normalize location value: allow string, dict, or list
-                if isinstance(loc_name, dict):
-                    loc_name = loc_name.get("name") or loc_name.get("location") or next(iter(loc_name.values()), None)
-                if isinstance(loc_name, list):
-                    loc_name = ", ".join(str(x) for x in loc_name)
-                loc_id = None
-                if loc_name:
-                    if args.dry_run:
-                        # simulate id assignment
-                        if loc_name not in existing_locations:
-                            existing_locations[loc_name] = next_id_ref[0]
-                            next_id_ref[0] += 1
-                        loc_id = existing_locations[loc_name]
-                    else:
-                        # ensure in DB
-                        loc_id = ensure_location(cur, loc_name, existing_locations, next_id_ref)
-
-                print("  Program:", p.get("id"), "-> location_id", loc_id)
-                if not args.dry_run:
-                    upsert_study_program(cur, p, loc_id)
-
-                # create lookup rows between this program and all courses in file
-                for c in courses:
-                    if not c.get("id"):
-                        continue
-                    if not args.dry_run:
-                        insert_lookup(cur, p.get("title"), c.get("id"))
+                pushed.append((key, fp))
+
+            push_document(cur, data, existing_locations, next_id_ref, dry_run=args.dry_run, writer=writer)
 
         if not args.dry_run and conn:
+            if writer is not None:
+                writer.flush()
+            if args.staging:
+                conn.commit()
+                table_swap.swap(cur)
+                print("Swapped staging tables into place (previous tables kept as *__previous).")
+            # versjonen følger dataene i samme transaksjon (etter byttet med --staging)
+            bump_catalogue_version(cur)
             conn.commit()
             print("Committed changes to database.")
+            elapsed = time.perf_counter() - started
+            if writer is not None:
+                print(f"{writer.rows} rows in {writer.statements} statements, {elapsed:.2f}s "
+                      f"({writer.rows / elapsed if elapsed else 0:.0f} rows/s)")
+            else:
+                print(f"Done in {elapsed:.2f}s")
+            # husk filene først når de faktisk er skrevet
+            for key, fp in pushed:
+                store.commit("json_file", key, fp)
+            if store is not None:
+                print(f"{len(pushed)} changed document(s) in {len(files)} files.")
         else:
             print("Dry run complete; no changes written.")
 
@@ -58,4 +58,12 @@ CREATE TABLE IF NOT EXISTS lookuptalbe_study_course
 	CONSTRAINT course_id_fk
 		FOREIGN KEY(course_id)
         REFERENCES courses(course_id)
+);
+
+-- økes av Push2SQL ved hver endring, så lesere (MCP-serverens cache) ser at katalogen er ny
+CREATE TABLE IF NOT EXISTS catalogue_version
+(
+	id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Benchmark: section lookup in StudyDataExtractor, linear scan vs. section index.
+
+Compares the old extract_section_text (scan every h2/h3, then walk
+find_all_next() for each lookup) with the index built once in parse_html.
+Both variants include the parse the extractor actually does (DEFAULT_PARSER,
+restricted to the study regions by STUDY_PAGE_STRAINER), since that is what
+a real extraction pays per page.
+
+Measured with lxml on the 156 study pages in http_cache.sqlite: about
+2.5 ms per page with the linear scan, and the index is 1.04-1.08x faster
+(the two lookups cost about 0.3 ms, the index build about 0.17 ms).
+The two fixture pages give about 1.10x. The gain is small, since only two
+sections are looked up per page, but it shows up in every run.
+
+Usage:
+  python Scraping/benchmarks/bench_sections.py [page.html ...] [--repeat 5]
+
+Without paths, the saved study pages in Scraping/http_cache.sqlite are used.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from DataExtractor import DEFAULT_PARSER, STUDY_PAGE_STRAINER, StudyDataExtractor, index_sections
+from http_cache import DEFAULT_PATH
+
+HEADINGS = ["Hvorfor velge dette studiet?", "Hva lærer du?"]
+
+
+def scan_section_text(soup: BeautifulSoup, heading_text: str) -> Optional[str]:
+    """The previous extract_section_text implementation, kept for comparison."""
+    heading = None
+    for h in soup.find_all(['h2', 'h3']):
+        if h.get_text(separator=" | ",strip=True) == heading_text:
+            heading = h
+            break
+    if not heading:
+        return None
+    parts = []
+    for el in heading.find_all_next():
+        if el.name in ['h2', 'h3'] and el != heading:
+            break
+        if el.name in ['p']:
+            text = el.get_text(separator=" | ",strip=True)
+            if text:
+                parts.append(text)
+    return "\n".join(parts) if parts else None
+
+
+def load_pages(paths: List[str]) -> List[str]:
+    if paths:
+        files = [f for p in paths for f in sorted(glob.glob(p))]
+        pages = []
+        for f in files:
+            with open(f, "r", encoding="utf-8") as fh:
+                pages.append(fh.read())
+        return pages
+    if not os.path.exists(DEFAULT_PATH):
+        return []
+    db = sqlite3.connect(DEFAULT_PATH)
+    rows = db.execute("SELECT body FROM responses WHERE body LIKE '%study-detail__title%'").fetchall()
+    db.close()
+    return [r[0] for r in rows]
+
+
+def time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark section lookup on saved study pages")
+    parser.add_argument("paths", nargs="*", help="HTML files or glob patterns")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths)
+    if not pages:
+        print("No study pages found. Pass HTML files or run the crawler first to fill http_cache.sqlite.")
+        return
+
+    rows = []
+    for html in pages:
+        soup = BeautifulSoup(html, DEFAULT_PARSER, parse_only=STUDY_PAGE_STRAINER)
+        # sjekk at begge variantene gir samme resultat
+        index = index_sections(soup)
+        for h in HEADINGS:
+            assert scan_section_text(soup, h) == index.get(h), f"mismatch for '{h}'"
+
+        def legacy():
+            s = BeautifulSoup(html, DEFAULT_PARSER, parse_only=STUDY_PAGE_STRAINER)
+            for h in HEADINGS:
+                scan_section_text(s, h)
+
+        def indexed():
+            with contextlib.redirect_stdout(io.StringIO()):
+                e = StudyDataExtractor(html)
+            for h in HEADINGS:
+                e.extract_section_text(h)
+
+        rows.append((
+            time_ms(legacy, args.repeat),
+            time_ms(indexed, args.repeat),
+            time_ms(lambda: [scan_section_text(soup, h) for h in HEADINGS], args.repeat),
+            time_ms(lambda: index_sections(soup), args.repeat),
+        ))
+
+    legacy_page, indexed_page, legacy_lookup, index_build = (statistics.mean(c) for c in zip(*rows))
+    print(f"{len(pages)} study pages ({DEFAULT_PARSER}, study regions only), median of {args.repeat} runs, mean per page:")
+    print(f"  parse + lookups, linear scan : {legacy_page:8.2f} ms")
+    print(f"  parse + lookups, section index: {indexed_page:8.2f} ms  ({legacy_page / indexed_page:.2f}x)")
+    print(f"  lookups only, linear scan    : {legacy_lookup:8.2f} ms")
+    print(f"  index build (one traversal)  : {index_build:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
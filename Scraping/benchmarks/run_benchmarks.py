@@ -0,0 +1,258 @@
+"""
+Offline benchmark suite for the scraping and extraction path.
+
+Runs against the checked-in fixture pages in `fixtures/` (study, course and
+listing pages; `fixtures/pages.json` maps each URL to its file). The fixtures
+are loaded into a temporary HTML archive in replay mode, so course pages and
+listing pages are "fetched" without any network access.
+
+Measured (median of --repeat runs):
+- per study page: parse, each field selector, section lookups, location
+  matching, extract_study_info, extract_courses, structure_for_database,
+  JSON serialization and DataFrame conversion
+- per course page: parse_course_page
+- listing pages: scrape_urls (link discovery)
+- corpus: full extraction + JSON + DataFrames over all study pages
+
+Results are written as JSON to `results/` (or --output), tagged with the git
+commit, so runs can be compared with --compare.
+
+Usage:
+  python Scraping/benchmarks/run_benchmarks.py [--repeat 7] [--parser lxml] [--full]
+  python Scraping/benchmarks/run_benchmarks.py --compare results/old.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import bs4
+import course_cache
+import html_archive
+import http_cache
+from DataExtractor import DEFAULT_PARSER, StudyDataExtractor, match_location_and_studyType, parse_course_page
+from get_studies import scrape_urls
+
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+RESULTS = os.path.join(BENCH_DIR, "results")
+
+# samme selektorer som extract_study_info bruker
+FIELD_SELECTORS = {
+    "title": ".study-detail__title",
+    "description": ".study-detail--intro__text",
+    "study_category": ".study-detail--intro__tag",
+    "study_location": ".study-detail--campus__select",
+    "credits": "div.field.field--name-field-study-points.field--type-integer.field--label-hidden.field__item",
+    "language": "div.field.field--name-field-language.field--type-entity-reference.field--label-hidden.field__item",
+    "level": "div.field.field--name-field-level.field--type-entity-reference.field--label-hidden.field__item",
+    "mandatory_attendance": ".study-detail--courses__body.other-info",
+    "career_opportunities": "div.field--name-field-skills-jobs",
+    "contact_info": ".study-detail--questions",
+}
+SECTIONS = ["Hvorfor velge dette studiet?", "Hva lærer du?"]
+
+
+def median_ms(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> float:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+@contextlib.contextmanager
+def quiet():
+    # extractoren skriver statusmeldinger; de skal ikke måles eller vises
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def load_fixtures() -> Dict[str, str]:
+    with open(os.path.join(FIXTURES, "pages.json"), "r", encoding="utf-8") as fh:
+        index = json.load(fh)
+    pages = {}
+    for url, name in index.items():
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as fh:
+            pages[url] = fh.read()
+    return pages
+
+
+def install_replay_archive(pages: Dict[str, str], root: str):
+    """Load the fixtures into an archive and switch fetch() to offline replay."""
+    http_cache.configure(None)
+    archive = html_archive.configure(root, record=True)
+    for url, text in pages.items():
+        archive.store(url, text)
+    html_archive.configure(root, record=False, replay=True)
+
+
+def bench_study_page(url: str, html: str, repeat: int, parser: str, partial: bool) -> Dict[str, Any]:
+    def new_extractor() -> StudyDataExtractor:
+        with quiet():
+            return StudyDataExtractor(html, parser=parser, partial=partial)
+
+    e = new_extractor()
+    fields = {}
+    for field, selector in FIELD_SELECTORS.items():
+        fields[field] = median_ms(lambda: (el := e.soup.select_one(selector)) and el.get_text(separator=" | ", strip=True), repeat)
+    for heading in SECTIONS:
+        fields[f"section:{heading}"] = median_ms(lambda: e.extract_section_text(heading), repeat)
+    location_text = e.soup.select_one(FIELD_SELECTORS["study_location"]).get_text(separator=" | ", strip=True)
+    with quiet():
+        fields["location_match"] = median_ms(lambda: match_location_and_studyType(location_text), repeat)
+
+    with quiet():
+        timings = {
+            "parse": median_ms(new_extractor, repeat),
+            "extract_study_info": median_ms(e.extract_study_info, repeat),
+            # kald emnecache hver gang, så emnesidene parses på nytt
+            "extract_courses": median_ms(e.extract_courses, repeat, setup=lambda: course_cache.configure()),
+            "structure_for_database": median_ms(e.structure_for_database, repeat,
+                                                setup=lambda: (e.clear_cache(), course_cache.configure())),
+        }
+    data = e.structure_for_database()
+    timings["json"] = median_ms(lambda: json.dumps(data, ensure_ascii=False, indent=2), repeat)
+    timings["dataframes"] = median_ms(e.to_dataframes, repeat)
+    return {"url": url, "bytes": len(html.encode("utf-8")), "courses": len(data["courses"]),
+            "timings_ms": timings, "fields_ms": fields}
+
+
+def bench_corpus(study_pages: Dict[str, str], repeat: int, parser: str, partial: bool) -> Dict[str, Any]:
+    def run():
+        for html in study_pages.values():
+            e = StudyDataExtractor(html, parser=parser, partial=partial)
+            json.dumps(e.structure_for_database(), ensure_ascii=False, indent=2)
+            e.to_dataframes()
+
+    with quiet():
+        total = median_ms(run, repeat, setup=lambda: course_cache.configure())
+    return {"studies": len(study_pages), "total_ms": total,
+            "per_study_ms": round(total / len(study_pages), 4) if study_pages else 0.0}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run(repeat: int, parser: str, partial: bool) -> Dict[str, Any]:
+    pages = load_fixtures()
+    study_pages = {u: h for u, h in pages.items() if "study-detail__title" in h}
+    course_pages = {u: h for u, h in pages.items() if "facts-containter" in h}
+
+    with tempfile.TemporaryDirectory() as root:
+        install_replay_archive(pages, root)
+        try:
+            studies = [bench_study_page(u, h, repeat, parser, partial) for u, h in study_pages.items()]
+            courses = [{"url": u, "bytes": len(h.encode("utf-8")),
+                        "parse_ms": median_ms(lambda: parse_course_page(h, parser, partial), repeat)}
+                       for u, h in course_pages.items()]
+            with quiet():
+                listing = {"links": len(scrape_urls(True)),
+                           "scrape_urls_ms": median_ms(lambda: scrape_urls(True), repeat)}
+            corpus = bench_corpus(study_pages, repeat, parser, partial)
+        finally:
+            html_archive.configure(None)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "bs4": bs4.__version__,
+            "parser": parser,
+            "partial": partial,
+            "repeat": repeat,
+        },
+        "study_pages": studies,
+        "course_pages": courses,
+        "listing": listing,
+        "corpus": corpus,
+    }
+
+
+def flatten(result: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten a result into metric-name -> ms, for comparisons."""
+    flat = {}
+    for s in result["study_pages"]:
+        for k, v in s["timings_ms"].items():
+            flat[f"{s['url']} {k}"] = v
+    for c in result["course_pages"]:
+        flat[f"{c['url']} parse"] = c["parse_ms"]
+    flat["listing scrape_urls"] = result["listing"]["scrape_urls_ms"]
+    flat["corpus total"] = result["corpus"]["total_ms"]
+    return flat
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]):
+    before, after = flatten(old), flatten(new)
+    print(f"\nComparison {old['meta'].get('commit')} -> {new['meta'].get('commit')} (new/old, >1 is slower):")
+    for name in sorted(set(before) & set(after)):
+        ratio = after[name] / before[name] if before[name] else float("inf")
+        flag = "  <-- regression" if ratio > 1.10 else ""
+        print(f"  {ratio:6.2f}x  {before[name]:9.3f} -> {after[name]:9.3f} ms  {name}{flag}")
+
+
+def print_summary(result: Dict[str, Any]):
+    meta = result["meta"]
+    print(f"Benchmark @ {meta['commit']}  parser={meta['parser']} partial={meta['partial']} repeat={meta['repeat']}")
+    for s in result["study_pages"]:
+        t = s["timings_ms"]
+        print(f"  {s['url']}  ({s['bytes']} B, {s['courses']} emner)")
+        print("    " + "  ".join(f"{k}={v:.2f}" for k, v in t.items()))
+    parse = [c["parse_ms"] for c in result["course_pages"]]
+    if parse:
+        print(f"  course pages: {len(parse)}, parse median {statistics.median(parse):.2f} ms")
+    print(f"  listing: {result['listing']['links']} links, scrape_urls {result['listing']['scrape_urls_ms']:.2f} ms")
+    c = result["corpus"]
+    print(f"  corpus: {c['studies']} studies, {c['total_ms']:.2f} ms total, {c['per_study_ms']:.2f} ms/study")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scraper/extractor")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--parser", default=DEFAULT_PARSER, help="BeautifulSoup parser backend")
+    parser.add_argument("--full", action="store_true", help="parse whole pages (no partial parsing)")
+    parser.add_argument("--output", help="result file (default: results/bench-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    result = run(args.repeat, args.parser, partial=not args.full)
+    print_summary(result)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS, f"bench-{result['meta']['commit'] or 'nocommit'}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            compare(json.load(fh), result)
+
+
+if __name__ == "__main__":
+    main()
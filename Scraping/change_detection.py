@@ -0,0 +1,155 @@
+"""
+Content fingerprints stored between runs, so a sync only handles what changed.
+
+Fingerprints (SHA-256) are kept per kind and key:
+  study_page   study URL -> the parsed regions of the study page
+  study        study URL -> the extracted study program record
+  course       course id -> the extracted course record (learning outcomes etc.)
+  json_file    file path -> a JSON document pushed by Push2SQL.py --changed-only
+
+`check()` compares a new fingerprint with the stored one and returns NEW,
+CHANGED or UNCHANGED without storing it; `commit()` stores it once the change
+has been written (JSON file and/or database), so a failed push is retried
+on the next run. A `ChangeReport` collects the outcome of a run.
+
+Usage:
+  import change_detection
+  store = change_detection.configure()
+  status = store.check("study", url, change_detection.fingerprint(record))
+  ...
+  store.commit("study", url, fp)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints.sqlite")
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def fingerprint(value: Any) -> str:
+    """SHA-256 of a string, or of a JSON-serializable value in canonical form."""
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """SQLite table of (kind, key) -> fingerprint, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, hash TEXT NOT NULL, "
+            "changed_at REAL NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        self._db.commit()
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM fingerprints WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return row[0] if row else None
+
+    def check(self, kind: str, key: str, fp: str) -> str:
+        """Compare `fp` with the stored fingerprint: NEW, CHANGED or UNCHANGED."""
+        old = self.get(kind, key)
+        if old is None:
+            return NEW
+        return UNCHANGED if old == fp else CHANGED
+
+    def commit(self, kind: str, key: str, fp: str):
+        """Store `fp` as the current fingerprint (after the change has been written)."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO fingerprints (kind, key, hash, changed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(kind, key) DO UPDATE SET hash = excluded.hash, changed_at = excluded.changed_at "
+                "WHERE fingerprints.hash != excluded.hash",
+                (kind, key, fp, time.time()),
+            )
+            self._db.commit()
+
+    def forget(self, kind: str, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM fingerprints WHERE kind = ? AND key = ?", (kind, key))
+            self._db.commit()
+
+    def keys(self, kind: str) -> Set[str]:
+        with self._lock:
+            return {r[0] for r in self._db.execute("SELECT key FROM fingerprints WHERE kind = ?", (kind,))}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ChangeReport:
+    """Thread-safe tally of NEW/CHANGED/UNCHANGED per kind for one run (each key counted once)."""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._seen: Set[Tuple[str, str]] = set()
+        self.changed: Dict[str, List[str]] = {}
+        self.removed: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, key: str, status: str):
+        with self._lock:
+            # felles emner dukker opp i mange studier
+            if (kind, key) in self._seen:
+                return
+            self._seen.add((kind, key))
+            counts = self.counts.setdefault(kind, {NEW: 0, CHANGED: 0, UNCHANGED: 0})
+            counts[status] += 1
+            if status != UNCHANGED:
+                self.changed.setdefault(kind, []).append(key)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counts": {k: dict(v) for k, v in self.counts.items()},
+                "changed": {k: list(v) for k, v in self.changed.items()},
+                "removed": list(self.removed),
+            }
+
+
+def print_report(report: Dict[str, Any], limit: int = 20):
+    print("  endringer:")
+    for kind, counts in report["counts"].items():
+        print(f"    {kind:<11} {counts[NEW]:5d} nye  {counts[CHANGED]:5d} endret  {counts[UNCHANGED]:5d} uendret")
+    for kind, keys in report["changed"].items():
+        for key in keys[:limit]:
+            print(f"      ~ {kind}: {key}")
+        if len(keys) > limit:
+            print(f"      ... og {len(keys) - limit} til")
+    for url in report["removed"][:limit]:
+        print(f"      - borte fra nettsiden: {url}")
+
+
+_store: Optional[FingerprintStore] = None
+
+
+def get_store() -> Optional[FingerprintStore]:
+    """Return the configured store, or None when change detection is off."""
+    return _store
+
+
+def configure(path: Optional[str] = DEFAULT_PATH) -> Optional[FingerprintStore]:
+    """Open the fingerprint store at `path`; None turns change detection off."""
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = FingerprintStore(path) if path else None
+    return _store
@@ -0,0 +1,226 @@
+"""
+Manifest of the extracted corpus in `json_for_processing/`.
+
+One row per study document (see corpus_reader.py for the keys) with:
+  hash          SHA-256 of the document text (same as the --changed-only fingerprint)
+  size          bytes of the document
+  offset        byte offset of the line in a .jsonl file (None for .json files)
+  study_id      id of the first study program
+  course_ids    course ids in the document
+  locations     location id -> name of the study programs
+  extracted_at  when the document was written (file mtime if indexed later)
+
+StudyDataExtractor.to_json() records each document as it is written. Files
+written some other way are picked up by `refresh()`, which re-indexes only
+files whose size or modification time differs from what the manifest saw,
+so tools can answer corpus-level questions and find changed documents
+without opening the JSON files.
+
+Usage:
+  import corpus_manifest
+  manifest = corpus_manifest.configure()
+  manifest.refresh(corpus_reader.corpus_files())
+  print(manifest.summary())
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import change_detection
+import corpus_reader
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_manifest.sqlite")
+
+
+def _locations(document: Dict[str, Any]) -> Dict[str, str]:
+    locations = {}
+    for program in document.get("study_programs") or []:
+        loc = program.get("study_location")
+        if isinstance(loc, dict):
+            locations.update({str(k): v for k, v in loc.items()})
+    return locations
+
+
+class CorpusManifest:
+    """SQLite manifest of corpus documents, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "  path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "  key TEXT PRIMARY KEY, path TEXT NOT NULL, hash TEXT NOT NULL, size INTEGER NOT NULL, offset INTEGER,"
+            "  study_id TEXT, course_ids TEXT NOT NULL, locations TEXT NOT NULL, extracted_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS documents_path ON documents (path);"
+        )
+        self._db.commit()
+
+    def _put_document(self, key: str, path: str, text: str, document: Dict[str, Any],
+                      offset: Optional[int], extracted_at: float):
+        programs = document.get("study_programs") or [{}]
+        encoded = text.encode("utf-8")
+        self._db.execute(
+            "INSERT OR REPLACE INTO documents (key, path, hash, size, offset, study_id, course_ids, locations, extracted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, path, hashlib.sha256(encoded).hexdigest(), len(encoded), offset, programs[0].get("id"),
+             json.dumps([c.get("id") for c in document.get("courses") or [] if c.get("id")], ensure_ascii=False),
+             json.dumps(_locations(document), ensure_ascii=False), extracted_at),
+        )
+
+    def _put_file(self, path: str):
+        st = os.stat(path)
+        self._db.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                         (path, st.st_size, st.st_mtime_ns))
+
+    def record(self, path: str, text: str, document: Dict[str, Any], offset: Optional[int] = None):
+        """Record a document just written to `path` (a whole .json file, or the line at `offset` in a .jsonl file)."""
+        path = os.path.abspath(path)
+        if offset is None:
+            key = path
+        else:
+            key = f"{path}#{(document.get('study_programs') or [{}])[0].get('id') or offset}"
+        with self._lock:
+            self._put_document(key, path, text, document, offset, time.time())
+            self._put_file(path)
+            self._db.commit()
+
+    def _index_file(self, path: str):
+        """Replace all entries of `path` by reading it once (caller holds the lock)."""
+        mtime = os.stat(path).st_mtime
+        self._db.execute("DELETE FROM documents WHERE path = ?", (path,))
+        if path.endswith(".jsonl"):
+            with open(path, "rb") as fh:
+                offset = 0
+                for number, raw in enumerate(fh, 1):
+                    line = raw.decode("utf-8").strip()
+                    if line:
+                        document = json.loads(line)
+                        self._put_document(corpus_reader.document_key(path, number, document), path, line,
+                                           document, offset, mtime)
+                    offset += len(raw)
+        else:
+            with open(path, "r", encoding="utf-8") as fh:
+                text = fh.read()
+            self._put_document(path, path, text, json.loads(text), None, mtime)
+        self._put_file(path)
+
+    def refresh(self, paths: Iterable[str]) -> int:
+        """Re-index the files in `paths` that are new or changed, and forget files that are gone.
+
+        Returns the number of files read.
+        """
+        paths = [os.path.abspath(p) for p in paths]
+        indexed = 0
+        with self._lock:
+            known = {r["path"]: (r["size"], r["mtime_ns"]) for r in self._db.execute("SELECT * FROM files")}
+            for path in paths:
+                st = os.stat(path)
+                if known.get(path) == (st.st_size, st.st_mtime_ns):
+                    continue
+                try:
+                    self._index_file(path)
+                    indexed += 1
+                except (OSError, ValueError) as e:
+                    print(f"✗ Kunne ikke indeksere {path}: {e}")
+            folders = {os.path.dirname(p) for p in paths}
+            for path in known:
+                if os.path.dirname(path) in folders and not os.path.exists(path):
+                    self._db.execute("DELETE FROM documents WHERE path = ?", (path,))
+                    self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._db.commit()
+        return indexed
+
+    def documents(self, paths: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Manifest entries (course_ids and locations decoded), optionally only for `paths`."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM documents ORDER BY key").fetchall()
+        wanted = {os.path.abspath(p) for p in paths} if paths is not None else None
+        entries = []
+        for row in rows:
+            if wanted is not None and row["path"] not in wanted:
+                continue
+            entry = dict(row)
+            entry["course_ids"] = json.loads(entry["course_ids"])
+            entry["locations"] = json.loads(entry["locations"])
+            entries.append(entry)
+        return entries
+
+    def changed_files(self, paths: Iterable[str], store: change_detection.FingerprintStore,
+                      kind: str = "json_file") -> List[str]:
+        """The files in `paths` with at least one document whose hash differs from `store`."""
+        changed = {e["path"] for e in self.documents(paths)
+                   if store.check(kind, e["key"], e["hash"]) != change_detection.UNCHANGED}
+        return [p for p in paths if os.path.abspath(p) in changed]
+
+    def summary(self, paths: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        entries = self.documents(paths)
+        courses = {cid for e in entries for cid in e["course_ids"]}
+        locations: Dict[str, str] = {}
+        for e in entries:
+            locations.update(e["locations"])
+        return {
+            "documents": len(entries),
+            "files": len({e["path"] for e in entries}),
+            "studies": len({e["study_id"] for e in entries if e["study_id"]}),
+            "courses": len(courses),
+            "course_links": sum(len(e["course_ids"]) for e in entries),
+            "locations": dict(sorted(locations.items(), key=lambda kv: int(kv[0]) if kv[0].isdigit() else kv[0])),
+            "bytes": sum(e["size"] for e in entries),
+            "last_extracted": max((e["extracted_at"] for e in entries), default=None),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_manifest: Optional[CorpusManifest] = None
+
+
+def get_manifest() -> Optional[CorpusManifest]:
+    """Return the configured manifest, or None when no manifest is kept."""
+    return _manifest
+
+
+def configure(path: Optional[str] = DEFAULT_PATH) -> Optional[CorpusManifest]:
+    """Open the manifest at `path`; None turns it off."""
+    global _manifest
+    if _manifest is not None:
+        _manifest.close()
+    _manifest = CorpusManifest(path) if path else None
+    return _manifest
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Oppsummer korpuset i json_for_processing fra manifestet")
+    parser.add_argument("--folder", default=corpus_reader.DEFAULT_FOLDER, help="mappe med json/jsonl-filer")
+    parser.add_argument("--manifest", default=DEFAULT_PATH, help="manifestfil")
+    args = parser.parse_args(argv)
+
+    manifest = configure(args.manifest)
+    files = corpus_reader.corpus_files(args.folder)
+    indexed = manifest.refresh(files)
+    summary = manifest.summary(files)
+    print(f"{len(files)} filer ({indexed} indeksert på nytt), {summary['documents']} dokumenter, "
+          f"{summary['bytes'] / 1e6:.1f} MB")
+    print(f"  studier: {summary['studies']}  emner: {summary['courses']}  koblinger: {summary['course_links']}")
+    for loc_id, name in summary["locations"].items():
+        print(f"  sted {loc_id}: {name}")
+    if summary["last_extracted"]:
+        print(f"  sist uttrukket: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary['last_extracted']))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Streaming reader for the extracted corpus in `json_for_processing/`.
+
+The corpus is either one JSON file per study (what DataExtractor.to_json
+writes by default) or JSON Lines files with one study document per line
+(to_json(jsonl=True) appends to `corpus.jsonl`). Both have the same document
+shape: {"study_programs": [...], "courses": [...]}.
+
+JSON files are read in chunks and their arrays are decoded one element at a
+time, so memory is bounded by the largest single record rather than by the
+file or the corpus; JSON Lines files are read one line at a time.
+
+- `iter_records()` yields (kind, record, source) per study program/course.
+- `iter_documents()` yields (key, fingerprint, document) per study, with the
+  fingerprint computed while reading (same value as
+  change_detection.fingerprint() of the file text), so --changed-only needs
+  no second pass.
+
+to_json(jsonl=True) only appends, so a study extracted again has several
+lines in `corpus.jsonl`. Both iterators yield only the last line per study
+(by `document_key()`); a cheap first pass that decodes just the first study
+program of each line finds them.
+
+Usage:
+  import corpus_reader
+  for kind, record, source in corpus_reader.iter_records(corpus_reader.corpus_files()):
+      ...
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+from glob import glob
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_for_processing")
+JSONL_NAME = "corpus.jsonl"
+CHUNK_SIZE = 64 * 1024
+
+# array i dokumentet -> posttype
+KINDS = {"study_programs": "program", "courses": "course"}
+
+_decoder = json.JSONDecoder()
+
+
+def corpus_files(folder: str = DEFAULT_FOLDER) -> List[str]:
+    """All .json and .jsonl files in `folder`, sorted."""
+    return sorted(glob(os.path.join(folder, "*.json")) + glob(os.path.join(folder, "*.jsonl")))
+
+
+class _Stream:
+    """Chunked reader that decodes one JSON value at a time with raw_decode."""
+
+    def __init__(self, fh, chunk_size: int = CHUNK_SIZE, hasher=None):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.hasher = hasher
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.hasher is not None:
+            self.hasher.update(chunk.encode("utf-8"))
+        # behold bare det som ikke er lest ennå
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # et tall i slutten av bufferet ("12", "3.", "1e") kan fortsette i neste bit
+            if (isinstance(value, (int, float)) and not self.eof
+                    and not self.buf[end:].lstrip("0123456789+-.eE") and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def drain(self):
+        """Read the rest of the input (so the hash covers the whole file)."""
+        while self._fill():
+            self.pos = len(self.buf)
+
+
+def iter_object_items(fh, chunk_size: int = CHUNK_SIZE, hasher=None) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, element) for each element of the arrays in a top-level JSON object.
+
+    Non-array values are yielded as (key, value).
+    """
+    s = _Stream(fh, chunk_size, hasher)
+    s.expect("{")
+    if s.peek() == "}":
+        s.drain()
+        return
+    while True:
+        key = s.value()
+        s.expect(":")
+        if s.peek() == "[":
+            s.expect("[")
+            if s.peek() != "]":
+                while True:
+                    yield key, s.value()
+                    if s.peek() != ",":
+                        break
+                    s.expect(",")
+            s.expect("]")
+        else:
+            yield key, s.value()
+        if s.peek() != ",":
+            break
+        s.expect(",")
+    s.expect("}")
+    s.drain()
+
+
+def _line_study_id(line: str) -> Optional[str]:
+    """Id of the first study program on a JSON Lines line, decoding nothing after it."""
+    for key, value in iter_object_items(io.StringIO(line)):
+        if key == "study_programs":
+            return value.get("id") if isinstance(value, dict) else None
+    return None
+
+
+def _latest_lines(fh) -> set:
+    """Numbers of the lines that hold the last version of each study in a JSON Lines file."""
+    latest: Dict[Any, int] = {}
+    for number, line in enumerate(fh, 1):
+        line = line.strip()
+        if line:
+            # samme nøkkel som document_key(): studie-id, ellers linjenummeret
+            latest[_line_study_id(line) or number] = number
+    return set(latest.values())
+
+
+def _jsonl_documents(fh) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    latest = _latest_lines(fh)
+    fh.seek(0)
+    for number, line in enumerate(fh, 1):
+        if number in latest:
+            line = line.strip()
+            yield number, line, json.loads(line)
+
+
+def document_key(path: str, number: int, document: Dict[str, Any]) -> str:
+    """Key of a document on line `number` of a JSON Lines file: `<abs path>#<study id>`."""
+    programs = document.get("study_programs") or [{}]
+    return f"{os.path.abspath(path)}#{programs[0].get('id') or number}"
+
+
+def _report(path: str, error: Exception, on_error: Optional[Callable[[str, Exception], None]]):
+    if on_error is None:
+        raise error
+    on_error(path, error)
+
+
+def iter_records(paths: Iterable[str], kinds: Optional[Iterable[str]] = None,
+                 on_error: Optional[Callable[[str, Exception], None]] = None) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """Yield (kind, record, source path) for every program ("program") and course ("course").
+
+    `kinds` limits the kinds yielded. With `on_error`, a file that cannot be
+    read is reported as on_error(path, exception) and the rest of it skipped;
+    otherwise the exception propagates.
+    """
+    wanted = set(kinds) if kinds is not None else set(KINDS.values())
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                if path.endswith(".jsonl"):
+                    for _, _, document in _jsonl_documents(fh):
+                        for key, kind in KINDS.items():
+                            if kind in wanted:
+                                for record in document.get(key) or []:
+                                    yield kind, record, path
+                else:
+                    for key, record in iter_object_items(fh):
+                        if KINDS.get(key) in wanted:
+                            yield KINDS[key], record, path
+        except (OSError, ValueError) as e:
+            _report(path, e, on_error)
+
+
+def iter_documents(paths: Iterable[str],
+                   on_error: Optional[Callable[[str, Exception], None]] = None) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yield (key, fingerprint, document) per study document.
+
+    The key is the absolute file path for .json files and `<path>#<study id>`
+    for documents in a .jsonl file. `on_error` works as in iter_records().
+    """
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                if path.endswith(".jsonl"):
+                    for number, line, document in _jsonl_documents(fh):
+                        yield document_key(path, number, document), hashlib.sha256(line.encode("utf-8")).hexdigest(), document
+                else:
+                    hasher = hashlib.sha256()
+                    document: Dict[str, Any] = {}
+                    for key, value in iter_object_items(fh, hasher=hasher):
+                        if key in KINDS:
+                            document.setdefault(key, []).append(value)
+                        else:
+                            document[key] = value
+                    yield os.path.abspath(path), hasher.hexdigest(), document
+        except (OSError, ValueError) as e:
+            _report(path, e, on_error)
+
+
+def _check_duplicate_lines():
+    """A study appended twice to a JSON Lines file is pushed once, as its last line, and then counts as unchanged."""
+    import tempfile
+    import change_detection
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, JSONL_NAME)
+        with open(path, "w", encoding="utf-8") as fh:
+            for study, text in (("A", "old"), ("B", "b"), ("A", "new")):
+                fh.write(json.dumps({"study_programs": [{"id": study, "description": text}], "courses": []}) + "\n")
+        store = change_detection.FingerprintStore(os.path.join(folder, "fingerprints.sqlite"))
+        # samme logikk som Push2SQL --changed-only
+        for expected in ([("A", "new"), ("B", "b")], []):
+            pushed = []
+            for key, fp, document in iter_documents([path]):
+                if store.check("json_file", key, fp) == change_detection.UNCHANGED:
+                    continue
+                pushed.append((document["study_programs"][0]["id"], document["study_programs"][0]["description"]))
+                store.commit("json_file", key, fp)
+            assert sorted(pushed) == expected, pushed
+        store.close()
+    print("✓ Duplicate JSON Lines entries: only the last line is pushed")
+
+
+if __name__ == "__main__":
+    _check_duplicate_lines()
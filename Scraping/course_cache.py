@@ -0,0 +1,163 @@
+"""
+Process-wide cache for parsed course details, keyed by course URL.
+
+Many study programs link to the same course pages. The cache makes sure each
+course page is downloaded and parsed once per crawl, no matter how many
+studies reference it.
+
+Behavior:
+- In-memory by default; pass `path` to back the cache with a SQLite file so
+  the parsed details survive between runs.
+- Entries older than `ttl` seconds are treated as missing (None = never expire).
+- `expire_before(t)` marks everything cached before `t` as stale, e.g. at the
+  start of a new crawl; stale entries are still served after a 304 answer.
+- Concurrent lookups of the same URL share one fetch.
+- Hit/miss counters are available through `stats()`.
+
+Usage:
+  import course_cache
+  course_cache.configure(path="course_cache.sqlite", ttl=24 * 3600)
+  details = course_cache.get_cache().get_or_fetch(url, fetch_function)
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CourseCache:
+    """Thread-safe cache of parsed course details with optional SQLite backing."""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_before = 0.0
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS course_details ("
+                "url TEXT PRIMARY KEY, details TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _expired(self, fetched_at: float) -> bool:
+        if fetched_at < self.not_before:
+            return True
+        return self.ttl is not None and time.time() - fetched_at > self.ttl
+
+    def expire_before(self, timestamp: float):
+        """Treat entries fetched before `timestamp` as expired (peek() still returns them)."""
+        with self._lock:
+            self.not_before = timestamp
+
+    def _load(self, url: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        # kalles med self._lock holdt
+        entry = self._entries.get(url)
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT details, fetched_at FROM course_details WHERE url = ?", (url,)
+            ).fetchone()
+            if row:
+                entry = (row[1], json.loads(row[0]))
+                self._entries[url] = entry
+        return entry
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached details for `url`, or None if missing/expired."""
+        with self._lock:
+            entry = self._load(url)
+            if entry is None or self._expired(entry[0]):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def peek(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached details for `url` even if expired, without counting."""
+        with self._lock:
+            entry = self._load(url)
+            return copy.deepcopy(entry[1]) if entry else None
+
+    def put(self, url: str, details: Dict[str, Any], fetched_at: Optional[float] = None):
+        """Store parsed details for `url`."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            self._entries[url] = (fetched_at, copy.deepcopy(details))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO course_details (url, details, fetched_at) VALUES (?, ?, ?)",
+                    (url, json.dumps(details, ensure_ascii=False), fetched_at),
+                )
+                self._db.commit()
+
+    def get_or_fetch(self, url: str, fetch: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return cached details for `url`, calling `fetch(url)` on a miss.
+
+        Exceptions from `fetch` propagate and nothing is cached, so failed
+        pages are retried on the next lookup.
+        """
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        # én tråd henter siden, de andre venter og får treff i cachen
+        with url_lock:
+            details = self.get(url)
+            if details is not None:
+                return details
+            details = fetch(url)
+            self.put(url, details)
+            return copy.deepcopy(details)
+
+    def clear(self):
+        """Remove all entries (memory and disk) and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM course_details")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# delt cache for hele prosessen
+_cache = CourseCache()
+
+
+def get_cache() -> CourseCache:
+    """Return the process-wide course cache."""
+    return _cache
+
+
+def configure(path: Optional[str] = None, ttl: Optional[float] = None) -> CourseCache:
+    """Replace the process-wide cache, e.g. to enable on-disk backing or a TTL."""
+    global _cache
+    _cache.close()
+    _cache = CourseCache(path=path, ttl=ttl)
+    return _cache
@@ -0,0 +1,178 @@
+"""
+Persistent crawl ledger, so an interrupted crawl can be resumed.
+
+Every study URL gets a row with the furthest state it has reached in the
+current run, the hash of its page content and a timestamp per state:
+
+  pending -> fetched -> extracted -> pushed
+
+A failed attempt keeps the state it got to and stores the error, so the next
+run retries it. URLs that reached the final state without an error are
+skipped by a resumed run.
+
+Runs:
+- `begin()` resumes the latest unfinished run, or starts a new one where all
+  URLs go back to pending (content hashes are kept).
+- `finish()` closes the run when nothing failed, so the next invocation
+  starts a fresh crawl.
+
+Usage:
+  import crawl_ledger
+  ledger = crawl_ledger.configure("crawl_ledger.sqlite")
+  run_id, resumed = ledger.begin()
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_ledger.sqlite")
+
+PENDING = "pending"
+FETCHED = "fetched"
+EXTRACTED = "extracted"
+PUSHED = "pushed"
+STATES = (PENDING, FETCHED, EXTRACTED, PUSHED)
+
+
+class CrawlLedger:
+    """SQLite-backed per-URL crawl state, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.run_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "  id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL NOT NULL, finished_at REAL);"
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "  url TEXT PRIMARY KEY, run_id INTEGER, state TEXT NOT NULL, content_hash TEXT, json_path TEXT,"
+            "  failures INTEGER NOT NULL DEFAULT 0, error TEXT, added_at REAL NOT NULL,"
+            "  fetched_at REAL, extracted_at REAL, pushed_at REAL, updated_at REAL NOT NULL);"
+        )
+        self._db.commit()
+
+    def _execute(self, sql: str, params: Tuple = ()):
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            self._db.commit()
+            return cur
+
+    def begin(self, fresh: bool = False) -> Tuple[int, bool]:
+        """Resume the latest unfinished run (unless `fresh`) or start a new one.
+
+        Returns (run id, resumed).
+        """
+        with self._lock:
+            row = self._db.execute("SELECT id, finished_at FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            if row is not None and row["finished_at"] is None and not fresh:
+                self.run_id = row["id"]
+                return self.run_id, True
+            now = time.time()
+            if row is not None and row["finished_at"] is None:
+                self._db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (now, row["id"]))
+            # ny kjøring: alt skal hentes på nytt, men behold innholdshashene
+            self._db.execute("UPDATE urls SET state = ?, error = NULL, failures = 0, updated_at = ?", (PENDING, now))
+            self.run_id = self._db.execute("INSERT INTO runs (started_at) VALUES (?)", (now,)).lastrowid
+            self._db.commit()
+            return self.run_id, False
+
+    def finish(self, final_state: str = PUSHED) -> bool:
+        """Close the current run if none of its URLs is left failed or short of `final_state`."""
+        done = STATES[STATES.index(final_state):]
+        with self._lock:
+            open_urls = self._db.execute(
+                f"SELECT COUNT(*) FROM urls WHERE run_id = ? AND (error IS NOT NULL "
+                f"OR state NOT IN ({', '.join('?' * len(done))}))", (self.run_id, *done)
+            ).fetchone()[0]
+            if open_urls or self.run_id is None:
+                return False
+            self._db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+            self._db.commit()
+            return True
+
+    def add(self, url: str):
+        """Register `url` in the current run (as pending if the ledger has not seen it before)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO urls (url, state, added_at, updated_at) VALUES (?, ?, ?, ?)",
+                             (url, PENDING, now, now))
+            self._db.execute("UPDATE urls SET run_id = ? WHERE url = ?", (self.run_id, url))
+            self._db.commit()
+
+    def entry(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM urls WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def is_done(self, url: str, final_state: str = PUSHED) -> bool:
+        """True if `url` reached `final_state` (or later) without an error."""
+        entry = self.entry(url)
+        return (entry is not None and entry["error"] is None
+                and STATES.index(entry["state"]) >= STATES.index(final_state))
+
+    def mark_fetched(self, url: str, content_hash: str):
+        now = time.time()
+        self._execute("UPDATE urls SET state = ?, content_hash = ?, error = NULL, fetched_at = ?, updated_at = ? "
+                      "WHERE url = ?", (FETCHED, content_hash, now, now, url))
+
+    def mark_extracted(self, url: str, json_path: Optional[str] = None, error: Optional[str] = None):
+        """Record a written JSON file; `error` marks partial data (e.g. missing course pages) for retry."""
+        now = time.time()
+        self._execute("UPDATE urls SET state = ?, json_path = ?, error = ?, extracted_at = ?, updated_at = ? "
+                      "WHERE url = ?", (EXTRACTED, json_path, error, now, now, url))
+
+    def mark_pushed(self, url: str):
+        now = time.time()
+        self._execute("UPDATE urls SET state = ?, pushed_at = ?, updated_at = ? WHERE url = ?",
+                      (PUSHED, now, now, url))
+
+    def mark_unchanged(self, url: str, final_state: str = PUSHED):
+        """Move `url` straight to `final_state`: its content is the same as in the last sync."""
+        now = time.time()
+        self._execute("UPDATE urls SET state = ?, error = NULL, updated_at = ? WHERE url = ?",
+                      (final_state, now, url))
+
+    def mark_failed(self, url: str, error: str):
+        """Keep the state reached so far and store the error, so the URL is retried."""
+        self._execute("UPDATE urls SET error = ?, failures = failures + 1, updated_at = ? WHERE url = ?",
+                      (error, time.time(), url))
+
+    def counts(self) -> Dict[str, int]:
+        """Number of URLs in the current run per state, plus how many are marked failed."""
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM urls WHERE run_id = ? GROUP BY state",
+                                    (self.run_id,)).fetchall()
+            failed = self._db.execute("SELECT COUNT(*) FROM urls WHERE run_id = ? AND error IS NOT NULL",
+                                      (self.run_id,)).fetchone()[0]
+        counts = {state: 0 for state in STATES}
+        counts.update({row[0]: row[1] for row in rows})
+        counts["failed"] = failed
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_ledger: Optional[CrawlLedger] = None
+
+
+def get_ledger() -> Optional[CrawlLedger]:
+    """Return the configured ledger, or None when crawl state is not tracked."""
+    return _ledger
+
+
+def configure(path: Optional[str] = DEFAULT_PATH) -> Optional[CrawlLedger]:
+    """Open the ledger at `path`; None turns tracking off."""
+    global _ledger
+    if _ledger is not None:
+        _ledger.close()
+    _ledger = CrawlLedger(path) if path else None
+    return _ledger
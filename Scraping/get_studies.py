@@ -1,17 +1,36 @@
-from bs4 import BeautifulSoup
-from urllib.request import Request, urlopen
-import time
+from bs4 import BeautifulSoup, SoupStrainer
+from http_cache import fetch
+from urllib.parse import urlparse
 import json
 import os
+import re
 
-BASE_URL = "https://fagskolen-viken.no"
+DEFAULT_BASE_URL = "https://fagskolen-viken.no"
+# kan pekes mot en annen vert (f.eks. mock_site.py) med FAGSKOLEN_BASE_URL eller set_base_url()
+BASE_URL = os.environ.get("FAGSKOLEN_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
 APPENT_FOR_OPPTAK = "f[0]=apent_for_opptak%3A1&"
 FILE = r"studies_urls.json"
+# bygg bare treet for studielenkene på oversiktssidene
+STUDY_LINK_STRAINER = SoupStrainer("a", class_="study-guide__link")
 
 """
 leser ut alle nettside linkene til studiene ved fagskolen
 """
 
+def set_base_url(url: str):
+    """Point study discovery at another site, e.g. http://127.0.0.1:8000 for mock_site.py."""
+    global BASE_URL
+    BASE_URL = url.rstrip("/")
+
+
+def buffer_name() -> str:
+    """Buffer file for the current BASE_URL, so URLs from a test site never mix with the real ones."""
+    if BASE_URL == DEFAULT_BASE_URL:
+        return FILE
+    host = re.sub(r"[^A-Za-z0-9.-]", "_", urlparse(BASE_URL).netloc)
+    return f"studies_urls_{host}.json"
+
+
 def get_urls(buffer_file: str, use_buffer:bool = False, only_available_studies:bool=True):
     # les url fra buffer
     if use_buffer and os.path.exists(buffer_file):
@@ -26,18 +45,33 @@ def get_urls(buffer_file: str, use_buffer:bool = False, only_available_studies:b
         return urls
 
 
+def iter_urls(buffer_file: str, use_buffer: bool = False, only_available_studies: bool = True):
+    """Som get_urls, men gir linkene etter hvert som de blir funnet (for pipeline.py)."""
+    if use_buffer and os.path.exists(buffer_file):
+        yield from get_urls(buffer_file, use_buffer=True)
+        return
+    urls = []
+    for url in iter_scrape_urls(only_available_studies):
+        urls.append(url)
+        yield url
+    with open(buffer_file, "w") as file:
+        file.write(json.dumps(urls, indent=4))
+
+
 def scrape_urls(only_available_studies:bool) -> list:
+    return list(iter_scrape_urls(only_available_studies))
+
+
+def iter_scrape_urls(only_available_studies:bool):
 
     # studiene er listet over flere sider, så inkrementer sidetall til alt er lest ut
     page = 0
-    urls = []
     while True:
 
         # send
-        url = f"{BASE_URL}/studier?{APPENT_FOR_OPPTAK if only_available_studies else ""}page={page}"
-        req = Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        html = urlopen(req).read().decode("utf-8", errors="ignore")
-        soup = BeautifulSoup(html, "lxml")
+        url = f"{BASE_URL}/studier?{APPENT_FOR_OPPTAK if only_available_studies else ''}page={page}"
+        html = fetch(url).text
+        soup = BeautifulSoup(html, "lxml", parse_only=STUDY_LINK_STRAINER)
 
         # hent ut alle studier
         results = soup.find_all("a", class_="study-guide__link", href=True)
@@ -46,20 +80,15 @@ def scrape_urls(only_available_studies:bool) -> list:
         if not results:
             break
 
-        # legg linker i listen
+        # gi videre linkene
         for link in results:
-            urls.append(BASE_URL + link['href'])
+            yield BASE_URL + link['href']
 
         page += 1
 
-        # vent litt mellom hver forespørsel
-        time.sleep(1)
-
-    return urls
-
 if __name__ == "__main__":
     path = os.path.join(os.path.dirname(__file__))+"\\"
-    urls = get_urls(path + FILE, use_buffer=True)
+    urls = get_urls(path + buffer_name(), use_buffer=True)
     
     print(f"Fagskolen tilbyr {len(urls)} forskejellige studier")
     print(f"{len(urls)} linker funnet")
@@ -0,0 +1,117 @@
+"""
+Compressed, content-addressed archive of raw study and course HTML.
+
+When recording, every page fetched through `http_cache.fetch` is stored
+gzip-compressed under its SHA-256 (identical pages are stored once), and an
+index maps each URL to the hash of its latest content. In replay mode
+`http_cache.fetch` reads from the archive instead of the network, so the
+whole catalogue can be re-extracted offline after a selector fix.
+
+Layout:
+  html_archive/
+    index.sqlite                 url -> sha256, size, archived_at
+    objects/ab/abcdef....html.gz
+
+Usage:
+  import html_archive
+  html_archive.configure(record=True)                 # crawl and archive
+  html_archive.configure(record=False, replay=True)   # offline re-extraction
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_archive")
+
+
+class HtmlArchive:
+    """Gzip objects keyed by content hash, with a SQLite URL index."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, record: bool = True, replay: bool = False):
+        self.root = root
+        self.record = record
+        self.replay = replay
+        self.stored = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, archived_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ".html.gz")
+
+    def store(self, url: str, text: str) -> str:
+        """Archive `text` as the content of `url` and return its hash."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            with self._lock:
+                self.deduplicated += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # skriv til midlertidig fil først, så et avbrutt kjør ikke gir halve objekter
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(gzip.compress(data))
+            os.replace(tmp, path)
+            with self._lock:
+                self.stored += 1
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, sha256, size, archived_at) VALUES (?, ?, ?, ?)",
+                (url, digest, len(data), time.time()),
+            )
+            self._db.commit()
+        return digest
+
+    def digest(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM pages WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, url: str) -> Optional[str]:
+        """Return the archived HTML for `url`, or None if it was never archived."""
+        digest = self.digest(url)
+        if digest is None:
+            return None
+        with gzip.open(self.object_path(digest), "rb") as fh:
+            return fh.read().decode("utf-8")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_archive: Optional[HtmlArchive] = None
+
+
+def get_archive() -> Optional[HtmlArchive]:
+    """Return the configured archive, or None when archiving is off."""
+    return _archive
+
+
+def configure(root: Optional[str] = DEFAULT_ROOT, record: bool = True, replay: bool = False) -> Optional[HtmlArchive]:
+    """Enable recording and/or replay; root=None turns the archive off."""
+    global _archive
+    if _archive is not None:
+        _archive.close()
+    _archive = HtmlArchive(root, record=record, replay=replay) if root else None
+    return _archive
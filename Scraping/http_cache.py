@@ -0,0 +1,142 @@
+"""
+On-disk HTTP cache for scraper fetches, using conditional requests.
+
+Each response is stored with its ETag/Last-Modified headers. Later fetches of
+the same URL send If-None-Match/If-Modified-Since, and a 304 answer returns
+the stored body without downloading the page again.
+
+Usage:
+  from http_cache import fetch
+  page = fetch(url)
+  page.text           # HTML (from the network or the cache)
+  page.not_modified   # True if the server answered 304
+
+The cache lives in `http_cache.sqlite` next to this script by default; use
+`configure(path)` to move it, or `configure(None)` to disable caching.
+
+If an archive is configured (see html_archive.py), fetched pages are
+recorded there, and in replay mode they are read from it without any
+network access.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+import html_archive
+import http_client
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.sqlite")
+
+
+class Page(NamedTuple):
+    url: str
+    text: str
+    not_modified: bool = False
+
+
+class HttpCache:
+    """SQLite store of response bodies and their validators (ETag/Last-Modified)."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "body": row[2], "fetched_at": row[3]}
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+            self._db.commit()
+
+    def touch(self, url: str):
+        """Mark a cached response as revalidated now."""
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache: Optional[HttpCache] = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+
+def configure(path: Optional[str] = DEFAULT_PATH) -> Optional[HttpCache]:
+    """Set the cache file used by fetch(); None disables the cache."""
+    global _cache, _cache_configured
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = HttpCache(path) if path else None
+        _cache_configured = True
+        return _cache
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Return the process-wide cache, opening the default file on first use."""
+    if not _cache_configured:
+        configure(DEFAULT_PATH)
+    return _cache
+
+
+def fetch(url: str) -> Page:
+    """Fetch `url`, revalidating a cached copy with a conditional request."""
+    archive = html_archive.get_archive()
+    if archive is not None and archive.replay:
+        text = archive.load(url)
+        if text is None:
+            raise LookupError(f"{url} finnes ikke i arkivet ({archive.root})")
+        return Page(url, text)
+
+    cache = get_cache()
+    cached = cache.get(url) if cache else None
+
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = http_client.get(url, headers=headers)
+    # 304: siden er uendret, bruk lagret innhold
+    if response.status_code == 304 and cached:
+        cache.touch(url)
+        if archive is not None and archive.record:
+            archive.store(url, cached["body"])
+        return Page(url, cached["body"], not_modified=True)
+    response.raise_for_status()
+
+    text = response.content.decode("utf-8", errors="ignore")
+    if cache:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            cache.put(url, text, etag, last_modified)
+    if archive is not None and archive.record:
+        archive.store(url, text)
+    return Page(url, text)
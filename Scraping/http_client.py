@@ -0,0 +1,106 @@
+"""
+Shared HTTP client for all scraper requests.
+
+One `requests.Session` is shared by the whole scraping package, so TCP/TLS
+connections are pooled and kept alive between requests, and responses are
+compressed (gzip/deflate). Requests are paced by the shared per-host rate
+limiter (see rate_limiter.py). Requests answered with 429 or 5xx are retried:
+429/503 make the limiter back off (honouring Retry-After), other 5xx use
+exponential backoff.
+
+Usage:
+  from http_client import get
+  response = get(url, headers={"If-None-Match": etag})
+
+If `requests` is not installed, install with:
+  pip install requests
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rate_limiter
+
+USER_AGENT = "Mozilla/5.0"
+# antall åpne forbindelser som holdes i live per vert
+POOL_SIZE = 16
+TIMEOUT = 30
+RETRIES = 4
+BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# statuser som betyr at serveren ber oss senke tempoet
+THROTTLE_STATUS = {429, 503}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            })
+            _session = session
+        return _session
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = TIMEOUT) -> requests.Response:
+    """GET `url` on the shared session, retrying 429/5xx and connection errors.
+
+    The last response is returned as-is (also for 304 and final error
+    statuses), so callers decide how to handle the status code.
+    """
+    session = get_session()
+    limiter = rate_limiter.get_limiter()
+    for attempt in range(RETRIES + 1):
+        limiter.acquire(url)
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == RETRIES:
+                raise
+            time.sleep(BACKOFF * 2 ** attempt)
+            continue
+
+        if response.status_code in THROTTLE_STATUS:
+            # limiteren pauser verten, så neste acquire() venter riktig tid
+            limiter.backoff(url, retry_after_seconds(response))
+        elif response.status_code in RETRY_STATUS:
+            if attempt < RETRIES:
+                time.sleep(BACKOFF * 2 ** attempt)
+        else:
+            limiter.success(url)
+
+        if response.status_code not in RETRY_STATUS or attempt == RETRIES:
+            return response
@@ -1,9 +1,16 @@
 from create_database import create_database
-from get_studies import get_urls
-from DataExtractor import extract
-from Push2SQL import main
-import time
+from get_studies import DEFAULT_BASE_URL, buffer_name, iter_urls, set_base_url
+from pipeline import CrawlPipeline
+from course_cache import get_cache
+from rate_limiter import get_limiter
+import change_detection
+import corpus_manifest
+import course_cache
+import crawl_ledger
+import html_archive
+import argparse
 import os
+import time
 
 """
 Starter scraping av nettsiden
@@ -11,21 +18,84 @@ Starter scraping av nettsiden
 2. Hent alle linker til studie sider
 3. Hent ut all data for hvert studi og lagre dem som json filer
 4. Lagrer skrapet data i databasen
+
+Steg 2-4 kjøres som en pipeline (se pipeline.py), slik at uttrekk og
+lagring i databasen overlapper.
+
+Fremdriften lagres i crawl_ledger.sqlite: krasjer en kjøring, fortsetter
+neste kjøring der den slapp (ferdige studier hoppes over, feilede prøves igjen).
+
+Fingeravtrykk fra forrige synk ligger i fingerprints.sqlite: alle studier
+trekkes ut, men uendrede studier skrives ikke til json eller databasen, og bare
+endrede rader skrives til databasen (--full-sync for alt).
 """
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Fagskolen Viken and push to MySQL")
+    parser.add_argument("--workers", type=int, default=4, help="antall parallelle uttrekk")
+    parser.add_argument("--rate", type=float, default=4.0, help="maks antall forespørsler per sekund mot nettsiden")
+    parser.add_argument("--queue-size", type=int, default=16, help="kapasitet på køene mellom stegene")
+    parser.add_argument("--no-push", action="store_true", help="skriv bare json, ikke til databasen")
+    parser.add_argument("--config", help="path to config.cnf for Push2SQL (optional)")
+    parser.add_argument("--archive", default=html_archive.DEFAULT_ROOT, help="mappe for arkiv av rå HTML")
+    parser.add_argument("--no-archive", action="store_true", help="ikke lagre rå HTML i arkivet")
+    parser.add_argument("--replay", action="store_true", help="les sider fra arkivet i stedet for nettsiden")
+    parser.add_argument("--base-url", help=f"nettsiden som skrapes (standard {DEFAULT_BASE_URL}, "
+                                           "eller FAGSKOLEN_BASE_URL); f.eks. mock_site.py for lasttest")
+    parser.add_argument("--ledger", default=crawl_ledger.DEFAULT_PATH, help="fil for lagret fremdrift (gjenoppta)")
+    parser.add_argument("--no-ledger", action="store_true", help="ikke lagre fremdrift, start alltid fra starten")
+    parser.add_argument("--fresh", action="store_true", help="start en ny kjøring selv om forrige ikke ble ferdig")
+    parser.add_argument("--full-sync", action="store_true", help="skriv og push alle studier, også uendrede")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="legg studiene til i json_for_processing/corpus.jsonl i stedet for én fil per studie")
+    args = parser.parse_args()
+
+    if args.base_url:
+        set_base_url(args.base_url)
+
+    # arkiver rå HTML, eller spill av fra arkivet uten nettverk
+    if args.replay:
+        html_archive.configure(args.archive, record=False, replay=True)
+    elif not args.no_archive:
+        html_archive.configure(args.archive, record=True)
+
+    # gjenoppta forrige kjøring hvis den ikke ble ferdig
+    if not args.no_ledger:
+        ledger = crawl_ledger.configure(args.ledger)
+        run_id, resumed = ledger.begin(fresh=args.fresh)
+        # emnesider fra en avbrutt kjøring gjenbrukes, en ny kjøring henter dem på nytt
+        course_cache.configure(path=os.path.join(os.path.dirname(os.path.abspath(args.ledger)), "course_cache.sqlite"))
+        if not resumed:
+            # ny kjøring: revalider emnesidene (304 gjenbruker lagrede detaljer)
+            get_cache().expire_before(time.time())
+        print(f"{'Gjenopptar' if resumed else 'Starter'} kjøring {run_id} ({args.ledger})")
+
+    # endringsdeteksjon: bare endrede studier skrives og pushes
+    change_detection.configure()
+    # manifest over json_for_processing, oppdateres når filene skrives
+    corpus_manifest.configure()
+
     # opprett database fra sql fil
-    create_database()
+    if not args.no_push:
+        create_database()
     
-    # hent linker
+    # hent linker, les ut alle data for studier og push til database
     path = os.path.join(os.path.dirname(__file__))+"\\"
-    urls = get_urls(path + r"studies_urls.json", use_buffer=True)
-    
-    # les ut alle data for studier
-    for url in urls:
-        extract(url)
-        # vent litt mellom hver forespørsel
-        time.sleep(1)
+    urls = iter_urls(path + buffer_name(), use_buffer=True)
+    CrawlPipeline(
+        urls,
+        workers=args.workers,
+        rate=args.rate,
+        queue_size=args.queue_size,
+        push=not args.no_push,
+        config=args.config,
+        full_sync=args.full_sync,
+        jsonl=args.jsonl,
+    ).run()
     
-    # push to database
-    main()
+    stats = get_cache().stats()
+    print(f"Emnecache: {stats['hits']} treff, {stats['misses']} bom ({stats['hit_rate']:.0%} treffrate)")
+    print(f"Rate limiter: {get_limiter().stats()}")
+    archive = html_archive.get_archive()
+    if archive is not None:
+        print(f"HTML-arkiv: {len(archive)} sider, {archive.stored} nye objekter, {archive.deduplicated} duplikater")
@@ -0,0 +1,352 @@
+"""
+Local stand-in for fagskolen-viken.no, for load testing the crawler.
+
+Serves synthetic pages in the markup get_studies.py and DataExtractor.py
+expect:
+  /studier?page=N        study listing (empty page after the last study)
+  /studier/<slug>        study detail page with campus, facts and course links
+  /emner/<code>          course page with facts and learning outcomes
+  /__stats               request counters as JSON
+
+Pages are generated deterministically from --seed, so thousands of studies
+cost no disk space and repeated runs see the same catalogue. --revision N
+simulates catalogue updates: in each revision a share (--changed-share) of
+the studies and courses get new text, so incremental syncs can be tested.
+
+Responses carry an ETag and honour If-None-Match. Latency, server errors
+(500) and rate limiting (429 with Retry-After) can be injected to test the
+crawler's concurrency, retries and backoff.
+
+Usage:
+  python Scraping/mock_site.py --studies 2000 --latency 0.05 --error-rate 0.01 --throttle-rate 0.02
+  python Scraping/main.py --base-url http://127.0.0.1:8000 --no-push --no-archive
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from DataExtractor import study_locations, study_types
+
+CATEGORIES = ["Elektrofag", "Helse", "Bygg og anlegg", "Økonomi og ledelse", "Maritime fag", "IT", "Kjemi og prosess"]
+SUBJECTS = ["Realfaglige redskap", "Kommunikasjon og ledelse", "Fagspesifikt emne", "Praksis", "Metode", "Hovedprosjekt",
+            "Digitalisering", "HMS og kvalitet", "Prosjektstyring", "Fordypning"]
+LEVELS = ["Fagskole (NKR nivå 5.1)", "Fagskole (NKR nivå 5.2)"]
+# felles emner som deles av mange studier, som på den ekte siden
+SHARED_COURSES = 40
+
+PAGE = """<!DOCTYPE html>
+<html lang="nb" dir="ltr">
+<head>
+  <meta charset="utf-8">
+  <title>{title} | Fagskolen i Viken</title>
+  <link rel="canonical" href="{canonical}">
+  <link rel="stylesheet" href="/themes/custom/fagskolen/css/style.css">
+  <script src="/core/assets/vendor/jquery/jquery.min.js"></script>
+</head>
+<body>
+  <header class="site-header">
+    <nav class="main-menu" aria-label="Hovedmeny">
+      <ul class="menu">{menu}</ul>
+    </nav>
+  </header>
+  <main id="main-content">
+{main}
+  </main>
+  <footer class="site-footer"><p>Fagskolen i Viken</p><ul>{menu}</ul></footer>
+  <script>window.dataLayer = window.dataLayer || [];</script>
+</body>
+</html>
+"""
+MENU = "".join(f'<li class="menu-item"><a href="/{m}">{m.title()}</a></li>'
+               for m in ["studier", "opptak", "studentliv", "om-oss", "kontakt"])
+
+
+class MockCatalogue:
+    """Deterministic synthetic catalogue of studies and courses."""
+
+    def __init__(self, studies: int = 200, page_size: int = 12, courses_per_study: int = 6,
+                 closed_share: float = 0.1, seed: int = 1, revision: int = 0, changed_share: float = 0.1):
+        self.studies = studies
+        self.page_size = page_size
+        self.courses_per_study = courses_per_study
+        self.closed_share = closed_share
+        self.seed = seed
+        self.revision = revision
+        self.changed_share = changed_share
+        self.base_url = ""
+
+    def slug(self, i: int) -> str:
+        return f"studie-{i:05d}"
+
+    def rng(self, *key) -> random.Random:
+        return random.Random(f"{self.seed}:" + ":".join(map(str, key)))
+
+    def last_revision(self, *key) -> int:
+        """Latest revision (<= self.revision) in which the page for `key` was changed."""
+        for rev in range(self.revision, 0, -1):
+            if self.rng("revision", rev, *key).random() < self.changed_share:
+                return rev
+        return 0
+
+    def revision_note(self, *key) -> str:
+        rev = self.last_revision(*key)
+        return f" Oppdatert i revisjon {rev}." if rev else ""
+
+    def is_open(self, i: int) -> bool:
+        """Whether the study is open for admission (shown with the apent_for_opptak filter)."""
+        return self.rng("open", i).random() >= self.closed_share
+
+    def listing(self, page: int, only_open: bool) -> str:
+        ids = [i for i in range(self.studies) if not only_open or self.is_open(i)]
+        chunk = ids[page * self.page_size:(page + 1) * self.page_size] if page >= 0 else []
+        items = "\n".join(
+            f'      <div class="study-guide__item"><a class="study-guide__link" href="/studier/{self.slug(i)}">'
+            f'<h3>Studie {i}</h3></a></div>'
+            for i in chunk
+        )
+        main = f'    <div class="study-guide">\n{items}\n    </div>'
+        return PAGE.format(title="Studier", canonical=f"{self.base_url}/studier", menu=MENU, main=main)
+
+    def course_codes(self, i: int) -> List[str]:
+        r = self.rng("courses", i)
+        shared = [f"00tm{n:02d}a" for n in r.sample(range(SHARED_COURSES), 2)]
+        own = [f"{i % 100:02d}s{i:05d}{n}" for n in range(max(0, self.courses_per_study - 2))]
+        return shared + own
+
+    def study(self, slug: str) -> Optional[str]:
+        if not slug.startswith("studie-") or not slug[7:].isdigit():
+            return None
+        i = int(slug[7:])
+        if i >= self.studies:
+            return None
+        r = self.rng("study", i)
+        title = f"Studie {i} {r.choice(CATEGORIES).lower()}"
+        campuses = r.sample(list(study_locations.values()), r.randint(1, 3))
+        options = "\n".join(
+            f'          <option value="{n}">{c} ({r.choice(list(study_types.values()))})</option>'
+            for n, c in enumerate(campuses)
+        )
+        courses = "\n".join(
+            f'          <a class="study-course__link" href="{self.base_url}/emner/{code}">\n'
+            f'            <span class="study-course__title">{escape(self.course_title(code))}</span>\n'
+            f'            <span class="study-course__points">{self.course_credits(code)} studiepoeng</span>\n'
+            f'          </a>'
+            for code in self.course_codes(i)
+        )
+        police = " Det kreves politiattest." if r.random() < 0.2 else ""
+        main = f"""    <article class="study-detail">
+      <div class="study-detail--intro">
+        <span class="study-detail--intro__tag">{escape(r.choice(CATEGORIES))}</span>
+        <h1 class="study-detail__title">{escape(title)}</h1>
+        <div class="study-detail--intro__text"><p>Syntetisk studie nummer {i} for lasttesting av skraperen.{self.revision_note("study", i)}</p></div>
+      </div>
+      <div class="study-detail--campus">
+        <select class="study-detail--campus__select" id="campus">
+{options}
+        </select>
+      </div>
+      <div class="study-detail--facts">
+        <div class="field field--name-field-study-points field--type-integer field--label-hidden field__item">{r.choice([30, 60, 90, 120])}</div>
+        <div class="field field--name-field-language field--type-entity-reference field--label-hidden field__item">Norsk</div>
+        <div class="field field--name-field-level field--type-entity-reference field--label-hidden field__item">{r.choice(LEVELS)}</div>
+      </div>
+      <section class="study-detail--text">
+        <h2>Hvorfor velge dette studiet?</h2>
+        <p>Studiet er praksisnært og utviklet i samarbeid med bransjen.</p>
+        <h2>Hva lærer du?</h2>
+        <p>Du lærer fagene som trengs i studie {i}.</p>
+      </section>
+      <section class="study-detail--courses">
+        <h2>Emner</h2>
+        <div class="study-detail--courses__list">
+{courses}
+        </div>
+        <div class="study-detail--courses__body other-info"><p>Det er obligatorisk oppmøte på samlingene.</p></div>
+      </section>
+      <section class="study-detail--admission">
+        <h2>Opptak</h2>
+        <p>Opptakskravet er fagbrev eller tilsvarende realkompetanse.{police}</p>
+      </section>
+      <section class="study-detail--jobs">
+        <h2>Karrieremuligheter</h2>
+        <div class="field--name-field-skills-jobs"><p>Du kan jobbe i både offentlig og privat sektor.</p></div>
+      </section>
+      <section class="study-detail--questions">
+        <h2>Har du noen spørsmål?</h2>
+        <p>Kontakt studieveileder på post@fagskolen-viken.no</p>
+      </section>
+    </article>"""
+        return PAGE.format(title=escape(title), canonical=f"{self.base_url}/studier/{slug}", menu=MENU, main=main)
+
+    def course_credits(self, code: str) -> int:
+        return self.rng("credits", code).choice([10, 20, 30])
+
+    def course_title(self, code: str) -> str:
+        return f"{self.rng('course', code).choice(SUBJECTS)} {code.upper()}"
+
+    def course(self, code: str) -> Optional[str]:
+        if not code.isalnum() or len(code) > 16:
+            return None
+        r = self.rng("course", code)
+        title = self.course_title(code)
+        note = self.revision_note("course", code)
+        outcomes = "\n".join(
+            f'      <div class="field-learning-outcome-{cls} label-above"><div class="field__label">{label}</div>'
+            f'<p>Kandidaten har {label.lower()} innen {escape(title.lower())}.{note}</p></div>'
+            for cls, label in [("knowledge", "Kunnskap"), ("skills", "Ferdigheter"), ("reflec", "Generell kompetanse")]
+        )
+        main = f"""    <article class="course-detail">
+      <h1 class="course-detail__title">{escape(title)}</h1>
+      <div id="facts-containter">
+        <ul class="facts">
+          <li><span class="facts-label">Emnekode</span><span class="facts-item">{code.upper()}</span></li>
+          <li><span class="facts-label">Studienivå</span><span class="facts-item">Fagskole, nivå {r.choice(["5.1", "5.2"])}</span></li>
+        </ul>
+      </div>
+{outcomes}
+    </article>"""
+        return PAGE.format(title=escape(title), canonical=f"{self.base_url}/emner/{code}", menu=MENU, main=main)
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, catalogue: MockCatalogue, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 1.0, quiet: bool = True):
+        super().__init__(address, MockSiteHandler)
+        self.catalogue = catalogue
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.quiet = quiet
+        self.counts: Counter = Counter()
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._random = random.Random(catalogue.seed)
+        host, port = self.server_address[:2]
+        catalogue.base_url = f"http://{host}:{port}"
+
+    def count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {**self.counts, "elapsed_s": round(elapsed, 1),
+                    "per_s": round(self.counts["requests"] / elapsed, 2) if elapsed > 0 else 0.0}
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    server: MockSiteServer
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        delay = server.latency + (server.roll() * server.jitter if server.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            return self.send(200, json.dumps(server.stats()), "application/json")
+
+        # injiserte feil, for å teste retries og backoff i skraperen
+        roll = server.roll()
+        if roll < server.throttle_rate:
+            return self.send(429, "Too Many Requests", headers={"Retry-After": f"{server.retry_after:g}"})
+        if roll < server.throttle_rate + server.error_rate:
+            return self.send(500, "Internal Server Error")
+
+        catalogue = server.catalogue
+        body = None
+        parts = url.path.strip("/").split("/")
+        if parts == ["studier"]:
+            query = parse_qs(url.query)
+            try:
+                page = int(query.get("page", ["0"])[0])
+            except ValueError:
+                page = -1
+            only_open = any("apent_for_opptak" in v for k, vs in query.items() if k.startswith("f[") for v in vs)
+            body = catalogue.listing(page, only_open)
+        elif len(parts) == 2 and parts[0] == "studier":
+            body = catalogue.study(parts[1])
+        elif len(parts) == 2 and parts[0] == "emner":
+            body = catalogue.course(parts[1])
+        if body is None:
+            return self.send(404, "Not Found")
+
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.send(304, "", headers={"ETag": etag})
+        self.send(200, body, "text/html; charset=utf-8", headers={"ETag": etag})
+
+    def send(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8",
+             headers: Optional[Dict[str, str]] = None):
+        self.server.count(str(status))
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local mock of the Fagskolen site for crawler load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--studies", type=int, default=200, help="antall studier i katalogen")
+    parser.add_argument("--page-size", type=int, default=12, help="studier per oversiktsside")
+    parser.add_argument("--courses-per-study", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.0, help="forsinkelse per forespørsel i sekunder")
+    parser.add_argument("--jitter", type=float, default=0.0, help="tilfeldig ekstra forsinkelse (0..jitter sekunder)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="andel forespørsler som gir 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="andel forespørsler som gir 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After på 429-svar (sekunder)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--revision", type=int, default=0, help="simulert katalogversjon (endrer en andel sider)")
+    parser.add_argument("--changed-share", type=float, default=0.1, help="andel sider endret per revisjon")
+    parser.add_argument("--verbose", action="store_true", help="logg hver forespørsel")
+    args = parser.parse_args(argv)
+
+    catalogue = MockCatalogue(args.studies, args.page_size, args.courses_per_study, seed=args.seed,
+                              revision=args.revision, changed_share=args.changed_share)
+    server = MockSiteServer((args.host, args.port), catalogue, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                            retry_after=args.retry_after, quiet=not args.verbose)
+    print(f"✓ Mock-side med {args.studies} studier på {catalogue.base_url} (Ctrl+C for å stoppe)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Forespørsler: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
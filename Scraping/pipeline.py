@@ -0,0 +1,385 @@
+"""
+Pipelined crawl runner for the scraper.
+
+Stages (connected by bounded queues, so extraction and ingestion overlap):
+1. URL discovery  - yields study URLs (from the buffer file or the site)
+2. Fetch/parse    - a pool of workers that extract each study and write its
+                    JSON file; requests are paced by the shared rate limiter
+3. DB writer      - pushes each extracted document to MySQL as it arrives
+
+Per-stage throughput and queue depths are reported while running and in a
+summary at the end.
+
+If a crawl ledger is configured (see crawl_ledger.py), each URL's progress is
+recorded there; URLs already finished in the current run are skipped, and
+studies that were extracted but not pushed are pushed from their JSON file.
+
+If change detection is on (see change_detection.py), every study is still
+fetched and extracted (course pages come from the course cache, revalidated
+with 304s), but studies whose page and extracted records are unchanged since
+the last sync are not written or pushed again, and only changed
+course/program rows go to the database.
+
+Usage:
+  from pipeline import CrawlPipeline
+  CrawlPipeline(urls, workers=4, rate=4.0).run()
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import change_detection
+import corpus_reader
+import crawl_ledger
+import rate_limiter
+from change_detection import UNCHANGED, fingerprint
+from DataExtractor import extract_study
+from Push2SQL import BatchWriter, bump_catalogue_version, load_locations, open_connection, push_document
+
+_STOP = object()
+
+
+class StageStats:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True):
+        with self._lock:
+            self.busy += seconds
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started
+        return {
+            "stage": self.name,
+            "processed": self.processed,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 2),
+            "busy_s": round(self.busy, 2),
+            "per_s": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class CrawlPipeline:
+    """Discovery -> fetch/parse workers -> DB writer, connected by bounded queues."""
+
+    def __init__(self, urls: Iterable[str], workers: int = 4, rate: Optional[float] = None, queue_size: int = 16,
+                 push: bool = True, config: Optional[str] = None, report_interval: float = 5.0,
+                 full_sync: bool = False, jsonl: bool = False):
+        """
+        Args:
+            urls: Iterable of study URLs; consumed lazily by the discovery stage.
+            workers: Number of fetch/parse workers.
+            rate: Requests per second per host for the shared rate limiter
+                (None = keep the current limiter, 0 = unlimited).
+            queue_size: Capacity of each queue between stages.
+            push: Write extracted documents to MySQL (False = only write JSON files;
+                fingerprints are then not stored, as nothing was synced).
+            config: Path to the MySQL config file used by Push2SQL.
+            report_interval: Seconds between progress reports (0 = only the summary).
+            full_sync: Write and push every study even if unchanged (fingerprints
+                are still updated).
+            jsonl: Append documents to the corpus JSONL file instead of
+                writing one JSON file per study.
+        """
+        self.urls = urls
+        self.workers = max(1, workers)
+        if rate is not None:
+            rate_limiter.configure(rate=rate)
+        self.push = push
+        self.config = config
+        self.report_interval = report_interval
+        self.url_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.write_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "discover": StageStats("discover"),
+            "extract": StageStats("extract"),
+            "write": StageStats("write"),
+        }
+        self.max_depth = {"urls": 0, "documents": 0}
+        self.failures: Dict[str, str] = {}
+        self.skipped = 0
+        self.ledger = crawl_ledger.get_ledger()
+        self.final_state = crawl_ledger.PUSHED if push else crawl_ledger.EXTRACTED
+        self.store = change_detection.get_store()
+        self.full_sync = full_sync
+        self.jsonl = jsonl
+        self.changes = change_detection.ChangeReport()
+        self.seen_urls = set()
+        self._discovery_complete = False
+        self._done = threading.Event()
+
+    def _resume(self, url: str) -> bool:
+        """Handle `url` from the ledger if possible; True means it needs no extraction."""
+        self.ledger.add(url)
+        if self.ledger.is_done(url, self.final_state):
+            self.skipped += 1
+            return True
+        entry = self.ledger.entry(url)
+        # uttrukket i en tidligere kjøring, men ikke skrevet: bruk json-filen
+        if (self.push and entry["state"] == crawl_ledger.EXTRACTED and entry["error"] is None
+                and entry["json_path"] and os.path.exists(entry["json_path"])):
+            try:
+                _, _, data = next(corpus_reader.iter_documents([entry["json_path"]]))
+            except (OSError, ValueError, StopIteration) as e:
+                # avkortet eller ødelagt fil fra en krasjet kjøring: trekk ut studiet på nytt
+                print(f"✗ Could not read {entry['json_path']}, extracting {url} again: {e!r}")
+                return False
+            self.stats["extract"].record(0.0)
+            self.write_queue.put((url, data, None))
+            return True
+        return False
+
+    def _detect_changes(self, url: str, extractor, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fingerprint the study page, the extracted study and its course records and compare with the last sync.
+
+        The extracted records are compared too, not just the HTML, so a fixed
+        selector or parser changes the result even when the pages (e.g. from
+        --replay) are byte-for-byte the same.
+        """
+        # bare regionene uttrekket leser, så endringer i meny/skript ikke teller
+        page_fp = fingerprint(str(extractor.soup))
+        courses = extractor.courses
+        # emner som ikke kunne hentes har ingen id: push_document hopper over dem, så raden i databasen beholdes
+        course_fps = {c["id"]: fingerprint(c) for c in courses if c.get("id")}
+        # kurslisten er med, så nye/fjernede emner gir nye koblinger
+        study_fp = fingerprint({
+            "programs": data["study_programs"],
+            "courses": [c.get("id") for c in data["courses"]],
+        })
+        changes = {
+            "page_fp": page_fp,
+            "page": self.store.check("study_page", url, page_fp),
+            "study_fp": study_fp,
+            "study": self.store.check("study", url, study_fp),
+            "course_fps": course_fps,
+            "courses": {cid: self.store.check("course", cid, fp) for cid, fp in course_fps.items()},
+        }
+        # med feilede emnesider regnes studiet aldri som uendret, så det prøves igjen
+        changes["unchanged"] = (not self.full_sync and changes["page"] == UNCHANGED and not extractor.failed_courses
+                                and changes["study"] == UNCHANGED
+                                and all(s == UNCHANGED for s in changes["courses"].values()))
+        self.changes.record("study_page", url, changes["page"])
+        self.changes.record("study", url, changes["study"])
+        for cid, status in changes["courses"].items():
+            self.changes.record("course", cid, status)
+        return changes
+
+    def _commit_changes(self, url: str, changes: Optional[Dict[str, Any]]):
+        """Store the fingerprints of a study once it has been written."""
+        if changes is None or self.store is None:
+            return
+        self.store.commit("study_page", url, changes["page_fp"])
+        self.store.commit("study", url, changes["study_fp"])
+        for cid, fp in changes["course_fps"].items():
+            self.store.commit("course", cid, fp)
+
+    def _discover(self):
+        stats = self.stats["discover"]
+        try:
+            for url in self.urls:
+                t0 = time.perf_counter()
+                self.seen_urls.add(url)
+                if self.ledger is None or not self._resume(url):
+                    self.url_queue.put(url)
+                stats.record(time.perf_counter() - t0)
+            self._discovery_complete = True
+        except Exception as e:
+            print(f"✗ Error discovering study URLs: {e}")
+        finally:
+            stats.finished = time.perf_counter()
+            for _ in range(self.workers):
+                self.url_queue.put(_STOP)
+
+    def _extract_worker(self):
+        stats = self.stats["extract"]
+        while True:
+            url = self.url_queue.get()
+            if url is _STOP:
+                break
+            t0 = time.perf_counter()
+            try:
+                extractor = extract_study(url)
+                if self.ledger:
+                    self.ledger.mark_fetched(url, fingerprint(extractor.html_content))
+                data = extractor.structure_for_database()
+                changes = self._detect_changes(url, extractor, data) if self.store else None
+                if changes is not None and changes["unchanged"]:
+                    # uttrukket, men uendret: verken json-fil eller push
+                    if self.ledger:
+                        self.ledger.mark_unchanged(url, self.final_state)
+                    stats.record(time.perf_counter() - t0)
+                    continue
+                extractor.to_json(jsonl=self.jsonl)
+                if self.ledger:
+                    # manglende emnesider: skriv det vi har, men prøv studiet igjen neste gang
+                    error = f"{len(extractor.failed_courses)} emnesider feilet" if extractor.failed_courses else None
+                    # JSONL-filen deles av alle studier; gjenopptak trekker da ut på nytt
+                    json_path = None if self.jsonl else str(extractor.json_path())
+                    self.ledger.mark_extracted(url, json_path, error)
+            except Exception as e:
+                print(f"✗ Error extracting {url}: {e}")
+                self.failures[url] = str(e)
+                if self.ledger:
+                    self.ledger.mark_failed(url, str(e))
+                stats.record(time.perf_counter() - t0, ok=False)
+                continue
+            stats.record(time.perf_counter() - t0)
+            self.write_queue.put((url, data, changes))
+
+    def _writer(self):
+        stats = self.stats["write"]
+        conn = cur = None
+        stopped = False
+        try:
+            if self.push:
+                conn = open_connection(self.config)
+                cur = conn.cursor()
+                existing_locations, next_id_ref = load_locations(cur)
+                batch = BatchWriter(cur)
+            while True:
+                item = self.write_queue.get()
+                if item is _STOP:
+                    stopped = True
+                    break
+                url, data, changes = item
+                if not self.push:
+                    # fingeravtrykkene beskriver databasen: uten push er ingenting synket
+                    stats.record(0.0)
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    if changes is None or self.full_sync:
+                        push_document(cur, data, existing_locations, next_id_ref, writer=batch)
+                    else:
+                        skip = {cid for cid, s in changes["courses"].items() if s == UNCHANGED}
+                        push_document(cur, data, existing_locations, next_id_ref,
+                                      skip_courses=skip,
+                                      skip_programs=changes["study"] == UNCHANGED, writer=batch)
+                    # én setning per tabell i stedet for én per rad
+                    rows_before = batch.rows
+                    batch.flush()
+                    if batch.rows > rows_before:
+                        bump_catalogue_version(cur)
+                    conn.commit()
+                    self._commit_changes(url, changes)
+                    if self.ledger:
+                        self.ledger.mark_pushed(url)
+                    stats.record(time.perf_counter() - t0)
+                except Exception as e:
+                    batch.discard()
+                    conn.rollback()
+                    print(f"✗ Error writing {url} to database: {e}")
+                    self.failures[url] = str(e)
+                    if self.ledger:
+                        self.ledger.mark_failed(url, str(e))
+                    stats.record(time.perf_counter() - t0, ok=False)
+        except Exception as e:
+            print(f"✗ Database writer stopped: {e}")
+        finally:
+            stats.finished = time.perf_counter()
+            if cur:
+                cur.close()
+            if conn:
+                conn.close()
+            # tøm køen så arbeiderne ikke blir hengende om skriveren feilet
+            if not stopped:
+                while self.write_queue.get() is not _STOP:
+                    pass
+
+    def _sample_depths(self):
+        self.max_depth["urls"] = max(self.max_depth["urls"], self.url_queue.qsize())
+        self.max_depth["documents"] = max(self.max_depth["documents"], self.write_queue.qsize())
+
+    def _report(self):
+        last = time.monotonic()
+        while not self._done.wait(0.2):
+            self._sample_depths()
+            if self.report_interval and time.monotonic() - last >= self.report_interval:
+                last = time.monotonic()
+                s = self.stats
+                print(f"[pipeline] funnet {s['discover'].processed} | uttrukket {s['extract'].processed} "
+                      f"(feil {s['extract'].failed}) | skrevet {s['write'].processed} | "
+                      f"kø url={self.url_queue.qsize()} dok={self.write_queue.qsize()}")
+
+    def run(self) -> Dict[str, Any]:
+        """Run all stages to completion and return the summary."""
+        # daemon-tråder, så Ctrl+C avslutter prosessen; fremdriften ligger i ledgeren
+        reporter = threading.Thread(target=self._report, daemon=True)
+        discoverer = threading.Thread(target=self._discover, name="discover", daemon=True)
+        workers = [threading.Thread(target=self._extract_worker, name=f"extract-{i}", daemon=True)
+                   for i in range(self.workers)]
+        writer = threading.Thread(target=self._writer, name="write", daemon=True)
+
+        reporter.start()
+        writer.start()
+        for w in workers:
+            w.start()
+        discoverer.start()
+
+        discoverer.join()
+        for w in workers:
+            w.join()
+        self.stats["extract"].finished = time.perf_counter()
+        self.write_queue.put(_STOP)
+        writer.join()
+        self._done.set()
+        reporter.join()
+
+        summary = {
+            "stages": [s.summary() for s in self.stats.values()],
+            "max_queue_depth": dict(self.max_depth),
+            "failures": dict(self.failures),
+            "skipped": self.skipped,
+        }
+        if self.store is not None:
+            if self._discovery_complete and not self.failures:
+                # studier som ikke lenger finnes på nettsiden rapporteres én gang
+                for url in sorted(self.store.keys("study_page") - self.seen_urls):
+                    self.changes.removed.append(url)
+                    self.store.forget("study_page", url)
+                    self.store.forget("study", url)
+            summary["changes"] = self.changes.summary()
+        if self.ledger:
+            summary["run_finished"] = self.ledger.finish(crawl_ledger.PUSHED if self.push else crawl_ledger.EXTRACTED)
+            summary["ledger"] = self.ledger.counts()
+        print_summary(summary)
+        return summary
+
+
+def print_summary(summary: Dict[str, Any]):
+    print("\n" + "=" * 70)
+    print("PIPELINE SUMMARY")
+    print("=" * 70)
+    for s in summary["stages"]:
+        print(f"  {s['stage']:<9} {s['processed']:5d} ok  {s['failed']:4d} feil  "
+              f"{s['elapsed_s']:8.2f}s  {s['per_s']:6.2f}/s  (aktiv {s['busy_s']:.2f}s)")
+    depth = summary["max_queue_depth"]
+    print(f"  maks kødybde: url={depth['urls']} dokumenter={depth['documents']}")
+    if "changes" in summary:
+        change_detection.print_report(summary["changes"])
+    if "ledger" in summary:
+        print(f"  hoppet over {summary['skipped']} ferdige fra forrige kjøring; ledger: {summary['ledger']}")
+        if not summary["run_finished"]:
+            print("  kjøringen er ikke ferdig, start på nytt for å fortsette med feilede/gjenstående")
+    if summary["failures"]:
+        print(f"  {len(summary['failures'])} feilet:")
+        for url, err in summary["failures"].items():
+            print(f"    {url}: {err}")
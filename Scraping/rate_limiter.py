@@ -0,0 +1,139 @@
+"""
+Token-bucket rate limiter for the crawler, one bucket per host.
+
+Every scraper request goes through `http_client.get`, which calls
+`acquire(url)` before sending. The limiter lets requests through at the
+configured requests-per-second rate (with a small burst) instead of fixed
+sleeps, and adapts to server pressure:
+
+- `backoff(url, retry_after)` on 429/503: halves the host rate (down to
+  `min_rate`) and pauses the host for Retry-After seconds if given.
+- `success(url)` on other responses: raises the rate again step by step,
+  up to the configured rate.
+
+Usage:
+  import rate_limiter
+  rate_limiter.configure(rate=5.0)
+  rate_limiter.get_limiter().acquire(url)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 4
+MIN_RATE = 0.2
+# hvor mye raten øker per vellykket forespørsel etter en backoff
+RECOVERY_STEP = 0.1
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an adjustable rate and a pause window."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.paused_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+            self._last = now
+
+
+class RateLimiter:
+    """Per-host token buckets with adaptive (AIMD) backoff."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, min_rate: float = MIN_RATE):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.backoffs = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str):
+        """Wait until a request to the host of `url` is allowed."""
+        if self.rate <= 0:
+            return
+        self.bucket(url).acquire()
+
+    def backoff(self, url: str, retry_after: Optional[float] = None):
+        """Slow down a host after 429/503, pausing it for Retry-After if given."""
+        if self.rate <= 0:
+            return
+        bucket = self.bucket(url)
+        with bucket._lock:
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            pause = retry_after if retry_after is not None else 1.0 / bucket.rate
+        bucket.pause(pause)
+        with self._lock:
+            self.backoffs += 1
+        print(f"  Rate limit fra {urlparse(url).netloc}: {bucket.rate:.2f} req/s, pause {pause:.1f}s")
+
+    def success(self, url: str):
+        """Let a host recover towards the configured rate."""
+        if self.rate <= 0:
+            return
+        bucket = self.bucket(url)
+        if bucket.rate < self.rate:
+            with bucket._lock:
+                bucket.rate = min(self.rate, bucket.rate + RECOVERY_STEP)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "backoffs": self.backoffs,
+                **{host: round(b.rate, 2) for host, b in self._buckets.items()},
+            }
+
+
+# delt begrenser for alle forespørsler i prosessen
+_limiter = RateLimiter()
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter."""
+    return _limiter
+
+
+def configure(rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, min_rate: float = MIN_RATE) -> RateLimiter:
+    """Replace the process-wide limiter; rate <= 0 disables limiting."""
+    global _limiter
+    _limiter = RateLimiter(rate=rate, burst=burst, min_rate=min_rate)
+    return _limiter
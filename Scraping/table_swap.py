@@ -0,0 +1,138 @@
+"""
+Staging tables and atomic swaps for the catalogue tables.
+
+Ingestion builds a complete new generation of the catalogue in shadow tables
+(`courses__staging`, ...) while the MCP server keeps reading the live tables.
+`swap()` then puts the new generation in place with a single RENAME TABLE
+statement, which MySQL performs atomically, and keeps the old generation so
+`rollback()` can switch back:
+
+  <table>__staging   being built
+  <table>            live
+  <table>__previous  the generation before the last swap
+
+The staging tables are created from SHOW CREATE TABLE of the live tables, with
+their foreign keys pointing at the other staging tables. Foreign key names
+must be unique per schema, so they get a generation tag (`courseID_fk__g<N>`),
+one higher than any tag already in the schema.
+
+Note that CREATE/DROP/RENAME TABLE commit the current transaction implicitly:
+create the staging tables before writing, and swap after committing.
+
+Usage:
+  import table_swap
+  table_swap.create_staging(cur, copy_live=True)
+  ... write into table_swap.staging_name("courses") ...
+  table_swap.swap(cur)
+  table_swap.rollback(cur)
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, List, Optional
+
+# foreldretabeller først, så kopiering og lasting følger fremmednøklene
+TABLES = ("courses", "study_place", "study_programs", "lookuptalbe_study_course")
+
+STAGING = "__staging"
+PREVIOUS = "__previous"
+_SWAP = "__swap"
+
+_FK_NAME = re.compile(r"CONSTRAINT `([^`]+)` FOREIGN KEY")
+_GENERATION_TAG = re.compile(r"__g(\d+)$")
+
+
+def staging_name(table: str) -> str:
+    return table + STAGING
+
+
+def previous_name(table: str) -> str:
+    return table + PREVIOUS
+
+
+def table_exists(cur, name: str) -> bool:
+    cur.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                (name,))
+    return cur.fetchone()[0] > 0
+
+
+def drop_tables(cur, names: Iterable[str]):
+    names = list(names)
+    if not names:
+        return
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        cur.execute("DROP TABLE IF EXISTS " + ", ".join(f"`{n}`" for n in names))
+    finally:
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+def staging_ddl(create_sql: str, generation: int) -> str:
+    """Rewrite a SHOW CREATE TABLE statement of a live table into its staging table."""
+    for table in TABLES:
+        create_sql = create_sql.replace(f"CREATE TABLE `{table}`", f"CREATE TABLE `{staging_name(table)}`")
+        create_sql = create_sql.replace(f"REFERENCES `{table}`", f"REFERENCES `{staging_name(table)}`")
+
+    def rename(match: re.Match) -> str:
+        base = _GENERATION_TAG.sub("", match.group(1))
+        return f"CONSTRAINT `{base}__g{generation}` FOREIGN KEY"
+
+    return _FK_NAME.sub(rename, create_sql)
+
+
+def next_generation(cur) -> int:
+    """One more than the highest generation tag on any foreign key in the schema (live, staging or previous)."""
+    cur.execute("SELECT constraint_name FROM information_schema.referential_constraints "
+                "WHERE constraint_schema = DATABASE()")
+    tags = [int(m.group(1)) for (name,) in cur.fetchall() if (m := _GENERATION_TAG.search(name))]
+    return max(tags, default=0) + 1
+
+
+def create_staging(cur, copy_live: bool = False, generation: Optional[int] = None) -> int:
+    """(Re)create empty staging tables shaped like the live ones; `copy_live` fills them with the live rows.
+
+    Returns the generation tag used for the foreign key names.
+    """
+    drop_tables(cur, [staging_name(t) for t in TABLES])
+    generation = generation or next_generation(cur)
+    for table in TABLES:
+        cur.execute(f"SHOW CREATE TABLE `{table}`")
+        cur.execute(staging_ddl(cur.fetchone()[1], generation))
+    if copy_live:
+        for table in TABLES:
+            cur.execute(f"INSERT INTO `{staging_name(table)}` SELECT * FROM `{table}`")
+    return generation
+
+
+def _rename_all(cur, pairs: List[tuple]):
+    cur.execute("RENAME TABLE " + ", ".join(f"`{a}` TO `{b}`" for a, b in pairs))
+
+
+def swap(cur):
+    """Put the staging tables live in one atomic RENAME; the live tables become __previous.
+
+    An older __previous generation is dropped first.
+    """
+    missing = [t for t in TABLES if not table_exists(cur, staging_name(t))]
+    if missing:
+        raise RuntimeError(f"staging tables missing for: {', '.join(missing)}")
+    drop_tables(cur, [previous_name(t) for t in TABLES])
+    pairs = []
+    for table in TABLES:
+        pairs.append((table, previous_name(table)))
+        pairs.append((staging_name(table), table))
+    _rename_all(cur, pairs)
+
+
+def rollback(cur):
+    """Swap the __previous generation back in place (calling it again undoes the rollback)."""
+    missing = [t for t in TABLES if not table_exists(cur, previous_name(t))]
+    if missing:
+        raise RuntimeError(f"no previous generation for: {', '.join(missing)}")
+    pairs = []
+    for table in TABLES:
+        pairs.append((table, table + _SWAP))
+        pairs.append((previous_name(table), table))
+        pairs.append((table + _SWAP, previous_name(table)))
+    _rename_all(cur, pairs)
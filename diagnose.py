@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 """Diagnostic: Check what's in the database vs. what should be there."""
-import json
-import glob
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scraping"))
+import corpus_manifest
+import corpus_reader
 
 print("=" * 60)
 print("DIAGNOSTIC: JSON vs. Database Comparison")
@@ -14,25 +17,23 @@ studies_without_loc = 0
 locations_from_json = {}
 
 print("\nScanning JSON files...")
-for fp in sorted(glob.glob('json_for_processing/*.json')):
-    try:
-        with open(fp, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        for prog in data.get('study_programs', []):
-            loc = prog.get('study_location') or {}
-            if isinstance(loc, dict) and len(loc) > 0:
-                studies_with_loc += 1
-                for loc_key, loc_name in loc.items():
-                    try:
-                        loc_id = int(loc_key)
-                        if loc_id not in locations_from_json:
-                            locations_from_json[loc_id] = loc_name
-                    except (ValueError, TypeError):
-                        print(f"  WARNING: Invalid location_id '{loc_key}' in {os.path.basename(fp)}")
-            else:
-                studies_without_loc += 1
-    except Exception as e:
-        print(f"  ERROR reading {fp}: {e}")
+# manifestet leser bare filer som er nye eller endret siden sist
+files = corpus_reader.corpus_files('json_for_processing')
+manifest = corpus_manifest.configure()
+print(f"  {manifest.refresh(files)} of {len(files)} files (re)indexed")
+for entry in manifest.documents(files):
+    loc = entry['locations']
+    if len(loc) > 0:
+        studies_with_loc += 1
+        for loc_key, loc_name in loc.items():
+            try:
+                loc_id = int(loc_key)
+                if loc_id not in locations_from_json:
+                    locations_from_json[loc_id] = loc_name
+            except (ValueError, TypeError):
+                print(f"  WARNING: Invalid location_id '{loc_key}' in {os.path.basename(entry['path'])}")
+    else:
+        studies_without_loc += 1
 
 print(f"\nJSON Statistics:")
 print(f"  Studies WITH location: {studies_with_loc}")